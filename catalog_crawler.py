@@ -0,0 +1,294 @@
+import argparse
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from concurrent_batch import ThreadLocalClient, run_bounded
+from resource_profiling import profile_batch
+
+# Префиксы путей, по которым определяется тип ссылки
+CATEGORY_PATH_PREFIX = "/catalog"
+PRODUCT_PATH_PREFIX = "/product/"
+
+# Размер блока при потоковом чтении HTML
+CHUNK_SIZE = 64 * 1024
+
+
+def link_kind(url: str) -> Optional[str]:
+    """Тип ссылки: 'category', 'product' или None для остальных страниц"""
+    path = urlsplit(url).path
+    if path.startswith(PRODUCT_PATH_PREFIX):
+        return "product"
+    if path == CATEGORY_PATH_PREFIX or path.startswith(CATEGORY_PATH_PREFIX + "/"):
+        return "category"
+    return None
+
+
+class RateLimiter:
+    """Ограничитель частоты запросов (token bucket), общий для всех потоков"""
+
+    def __init__(self, requests_per_second: float, burst: int = 1):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Дождаться разрешения на следующий запрос"""
+        if not self.interval:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                delay = (1.0 - self._tokens) * self.interval
+            time.sleep(delay)
+
+
+class UrlSet:
+    """Компактное множество URL: хранит 64-битные хеши вместо строк"""
+
+    def __init__(self):
+        self._digests: Set[int] = set()
+
+    @staticmethod
+    def _digest(url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def add(self, url: str) -> bool:
+        """Добавить URL; вернуть False, если он уже встречался"""
+        digest = self._digest(url)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._digest(url) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+class LinkExtractor(HTMLParser):
+    """Потоковый парсер ссылок: принимает HTML частями через feed()"""
+
+    def __init__(self, page_url: str):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.host = urlsplit(page_url).netloc
+        self.links: List[Tuple[str, str]] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        href = dict(attrs).get("href")
+        if not href or href.startswith(("javascript:", "mailto:", "tel:")):
+            return
+        url, _ = urldefrag(urljoin(self.page_url, href))
+        if urlsplit(url).netloc != self.host:
+            return
+        kind = link_kind(url)
+        if kind:
+            self.links.append((url, kind))
+
+
+class PageResult:
+    """Результат проверки одной страницы"""
+
+    def __init__(self, url: str, kind: str, depth: int, referrer: Optional[str]):
+        self.url = url
+        self.kind = kind
+        self.depth = depth
+        self.referrer = referrer
+        self.status_code = 0
+        self.elapsed = 0.0
+        self.redirects: List[Tuple[int, str]] = []
+        self.final_url = url
+        self.error: Optional[str] = None
+        self.links: List[Tuple[str, str]] = []
+
+    @property
+    def is_broken(self) -> bool:
+        return self.error is not None or self.status_code >= 400
+
+
+class CrawlReport:
+    """Итоги обхода каталога"""
+
+    def __init__(self, slow_threshold: float):
+        self.slow_threshold = slow_threshold
+        self.checked = {"category": 0, "product": 0}
+        self.broken: List[PageResult] = []
+        self.redirects: List[PageResult] = []
+        self.slow: List[PageResult] = []
+        self.duration = 0.0
+
+    def add(self, result: PageResult) -> None:
+        self.checked[result.kind] = self.checked.get(result.kind, 0) + 1
+        if result.is_broken:
+            self.broken.append(result)
+        if result.redirects:
+            self.redirects.append(result)
+        if result.elapsed >= self.slow_threshold:
+            self.slow.append(result)
+
+    @property
+    def total(self) -> int:
+        return sum(self.checked.values())
+
+    def format(self) -> str:
+        """Текстовый отчет для консоли и Allure"""
+        lines = [
+            f"Проверено страниц: {self.total} (категорий: {self.checked.get('category', 0)}, "
+            f"товаров: {self.checked.get('product', 0)}) за {self.duration:.1f} с",
+            f"Битых ссылок: {len(self.broken)}",
+        ]
+        for result in self.broken:
+            reason = result.error or f"HTTP {result.status_code}"
+            lines.append(f"  [{reason}] {result.url} (найдена на {result.referrer or '-'})")
+
+        lines.append(f"Цепочек редиректов: {len(self.redirects)}")
+        for result in sorted(self.redirects, key=lambda item: len(item.redirects), reverse=True):
+            chain = " -> ".join(f"{url} [{status}]" for status, url in result.redirects)
+            lines.append(f"  {chain} -> {result.final_url} [{result.status_code}]")
+
+        lines.append(f"Медленных страниц (>= {self.slow_threshold:.1f} с): {len(self.slow)}")
+        for result in sorted(self.slow, key=lambda item: item.elapsed, reverse=True):
+            lines.append(f"  {result.elapsed:6.2f} с  {result.url}")
+        return "\n".join(lines)
+
+
+class CatalogCrawler:
+    """Обход каталога с ограничением параллельности, частоты запросов и глубины"""
+
+    def __init__(self, client_factory: Callable, concurrency: int = 8, requests_per_second: float = 10.0,
+                 max_depth: int = 2, max_pages: int = 5000, slow_threshold: float = 3.0,
+                 check_products: bool = True, max_products: Optional[int] = None):
+        """
+        Args:
+            client_factory: Фабрика API клиента (используются session, headers, timeout, base_url).
+                Клиент не должен повторять запросы по статусу ответа, иначе в отчет попадут
+                статус и время последней попытки (ChitaiGorodAPI.factory(retries=0))
+            concurrency: Число параллельных потоков
+            requests_per_second: Ограничение частоты запросов ко всему сайту
+            max_depth: Максимальная глубина перехода от стартовой страницы
+            max_pages: Максимальное число проверяемых страниц категорий
+            slow_threshold: Порог медленной страницы, секунды
+            check_products: Проверять ли доступность найденных карточек товаров
+            max_products: Максимальное число проверяемых карточек товаров (по умолчанию max_pages)
+        """
+        self.client_factory = client_factory
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(requests_per_second, burst=concurrency)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_products = max_pages if max_products is None else max_products
+        self.slow_threshold = slow_threshold
+        self.check_products = check_products
+        self._clients = ThreadLocalClient(client_factory)
+
+    def _fetch(self, task: Tuple[str, str, int, Optional[str]]) -> PageResult:
+        url, kind, depth, referrer = task
+        client = self._clients.get()
+        result = PageResult(url, kind, depth, referrer)
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = client.session.get(url, headers=client.headers, timeout=client.timeout,
+                                          verify=False, allow_redirects=True, stream=True)
+            with response:
+                result.status_code = response.status_code
+                result.final_url = response.url
+                result.redirects = [(hop.status_code, hop.url) for hop in response.history]
+                # Ссылки извлекаются только из страниц категорий, которые будут обходиться дальше
+                if kind == "category" and response.status_code == 200 and depth < self.max_depth:
+                    response.encoding = response.encoding or "utf-8"
+                    extractor = LinkExtractor(response.url)
+                    for chunk in response.iter_content(CHUNK_SIZE, decode_unicode=True):
+                        extractor.feed(chunk)
+                    extractor.close()
+                    result.links = extractor.links
+                else:
+                    # Тело не нужно: дочитываем его без хранения, чтобы измерить полное время ответа
+                    for _ in response.iter_content(CHUNK_SIZE):
+                        pass
+        except Exception as e:
+            result.error = type(e).__name__
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def crawl(self, start_path: str = CATEGORY_PATH_PREFIX) -> CrawlReport:
+        """Обойти каталог начиная со start_path и собрать отчет о состоянии ссылок"""
+        report = CrawlReport(self.slow_threshold)
+        start_url = urljoin(self._clients.get().base_url, start_path)
+        seen = UrlSet()
+        seen.add(start_url)
+        # Категории и товары ставятся в отдельные очереди со своими лимитами: карточки товаров
+        # на странице категории не должны вытеснять подкатегории, от которых зависит обход
+        frontiers: Dict[str, Deque[Tuple[str, str, int, Optional[str]]]] = {
+            "category": deque([(start_url, "category", 0, None)]), "product": deque()}
+        limits = {"category": self.max_pages, "product": self.max_products if self.check_products else 0}
+        scheduled = {"category": 1, "product": 0}
+        max_in_flight = self.concurrency * 2
+
+        def next_task():
+            for frontier in frontiers.values():
+                if frontier:
+                    return frontier.popleft()
+            return None
+
+        start = time.perf_counter()
+        with profile_batch("catalog-crawl"), ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for _, result in run_bounded(executor, self._fetch, next_task, max_in_flight):
+                report.add(result)
+                for url, kind in result.links:
+                    if scheduled[kind] >= limits[kind]:
+                        continue
+                    if seen.add(url):
+                        frontiers[kind].append((url, kind, result.depth + 1, result.url))
+                        scheduled[kind] += 1
+                result.links = []
+
+        report.duration = time.perf_counter() - start
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> CrawlReport:
+    """Запуск обхода каталога из командной строки"""
+    from test_api import ChitaiGorodAPI
+
+    parser = argparse.ArgumentParser(description="Проверка ссылок каталога Читай-город")
+    parser.add_argument("--start", default=CATEGORY_PATH_PREFIX, help="Стартовый путь обхода")
+    parser.add_argument("--concurrency", type=int, default=8, help="Число параллельных потоков")
+    parser.add_argument("--rps", type=float, default=10.0, help="Максимум запросов в секунду")
+    parser.add_argument("--depth", type=int, default=2, help="Максимальная глубина обхода")
+    parser.add_argument("--max-pages", type=int, default=5000, help="Максимальное число страниц категорий")
+    parser.add_argument("--max-products", type=int, default=None,
+                        help="Максимальное число карточек товаров (по умолчанию как --max-pages)")
+    parser.add_argument("--slow", type=float, default=3.0, help="Порог медленной страницы, секунды")
+    parser.add_argument("--skip-products", action="store_true", help="Не проверять карточки товаров")
+    parser.add_argument("--http2", action="store_true",
+                        help="Общий HTTP/2 клиент для всех потоков (нужен httpx[http2])")
+    args = parser.parse_args(argv)
+
+    with ChitaiGorodAPI.factory(args.http2, retries=0, max_connections=args.concurrency) as client_factory:
+        crawler = CatalogCrawler(client_factory, args.concurrency, args.rps, args.depth,
+                                 args.max_pages, args.slow, not args.skip_products, args.max_products)
+        report = crawler.crawl(args.start)
+    print(report.format())
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class ThreadLocalClient:
+    """Клиент API на поток, создаваемый фабрикой при первом обращении из потока"""
+
+    def __init__(self, factory: Callable):
+        # requests.Session не рассчитана на общий доступ из потоков, поэтому клиент у каждого потока свой
+        self.factory = factory
+        self._local = threading.local()
+
+    def get(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.factory()
+        return client
+
+
+def run_bounded(executor: Executor, func: Callable[[Any], Any], next_task: Callable[[], Optional[Any]],
+                max_in_flight: int) -> Iterator[Tuple[Any, Any]]:
+    """
+    Выполнять задачи в executor, держа в полете не больше max_in_flight
+
+    next_task() возвращает следующую задачу или None, если задач пока нет. Пары (задача,
+    результат) выдаются по мере готовности; между ними вызывающий код может добавлять
+    новые задачи (например, найденные ссылки), и они будут отправлены на следующем шаге.
+    Память не зависит от общего числа задач.
+    """
+    pending: Dict[Any, Any] = {}
+    while True:
+        while len(pending) < max_in_flight:
+            task = next_task()
+            if task is None:
+                break
+            pending[executor.submit(func, task)] = task
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
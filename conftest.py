@@ -0,0 +1 @@
+pytest_plugins = ["step_tracing", "resource_profiling", "environments"]
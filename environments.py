@@ -0,0 +1,196 @@
+import os
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import yaml
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "test_api", "config", "environment.yaml.py")
+
+# Переменная окружения для переопределения адреса цели, например API_TARGET_URL_STAGING
+URL_OVERRIDE_PREFIX = "API_TARGET_URL_"
+
+# Скомпилированные описания по (путь, mtime, размер): файл разбирается один раз за процесс
+_compiled: Dict[tuple, dict] = {}
+
+
+class EnvironmentConfigError(ValueError):
+    """Ошибка в описании окружений"""
+
+
+class TargetEnvironment:
+    """Окружение (цель), на котором запускаются API и UI тесты"""
+
+    __slots__ = ("name", "base_url", "timeout", "endpoints")
+
+    def __init__(self, name: str, base_url: str, timeout: float, endpoints: Dict[str, str]):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.endpoints = endpoints
+
+    @property
+    def ui_base_url(self) -> str:
+        """Адрес главной страницы для Page Object"""
+        return self.base_url + "/"
+
+    def endpoint(self, name: str, default: str) -> str:
+        return self.endpoints.get(name, default)
+
+    def __repr__(self) -> str:
+        return f"TargetEnvironment(name={self.name!r}, base_url={self.base_url!r})"
+
+
+def _validate_endpoints(endpoints, where: str) -> Dict[str, str]:
+    if not isinstance(endpoints, dict):
+        raise EnvironmentConfigError(f"{where}: api_endpoints должен быть словарем")
+    for name, path in endpoints.items():
+        if not isinstance(path, str) or not path.startswith("/"):
+            raise EnvironmentConfigError(f"{where}: endpoint '{name}' должен начинаться с '/': {path!r}")
+    return dict(endpoints)
+
+
+def _validate_timeout(timeout, where: str) -> float:
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise EnvironmentConfigError(f"{where}: api_timeout должен быть положительным числом: {timeout!r}")
+    return float(timeout)
+
+
+def _validate_base_url(base_url, where: str) -> str:
+    parts = urlsplit(base_url) if isinstance(base_url, str) else None
+    if parts is None or parts.scheme not in ("http", "https") or not parts.netloc:
+        raise EnvironmentConfigError(f"{where}: некорректный base_url: {base_url!r}")
+    return base_url.rstrip("/")
+
+
+def compile_config(raw: dict) -> dict:
+    """
+    Проверить описание окружений и привести его к плоской форме
+
+    Поддерживаются два формата: один base_url с api_endpoints (одно окружение production)
+    и словарь environments, где каждое окружение может переопределять общие настройки.
+    """
+    if not isinstance(raw, dict):
+        raise EnvironmentConfigError("Описание окружений должно быть словарем")
+    common_endpoints = _validate_endpoints(raw.get("api_endpoints", {}), "api_endpoints")
+    common_timeout = _validate_timeout(raw.get("api_timeout", 30), "api_timeout")
+
+    environments = raw.get("environments")
+    if environments is None:
+        environments = {"production": {"base_url": raw.get("base_url")}}
+    if not isinstance(environments, dict) or not environments:
+        raise EnvironmentConfigError("environments должен быть непустым словарем")
+
+    compiled = {}
+    for name, definition in environments.items():
+        where = f"environments.{name}"
+        if not isinstance(definition, dict):
+            raise EnvironmentConfigError(f"{where}: описание окружения должно быть словарем")
+        endpoints = dict(common_endpoints)
+        endpoints.update(_validate_endpoints(definition.get("api_endpoints", {}), where))
+        base_url = definition.get("base_url")
+        compiled[str(name)] = {
+            # base_url: null - адрес обязательно задается переменной окружения
+            "base_url": _validate_base_url(base_url, where) if base_url is not None else None,
+            "timeout": _validate_timeout(definition.get("api_timeout", common_timeout), where),
+            "endpoints": endpoints,
+        }
+
+    default = str(raw.get("default", next(iter(compiled))))
+    if default not in compiled:
+        raise EnvironmentConfigError(f"Окружение по умолчанию '{default}' не описано")
+    return {"default": default, "environments": compiled}
+
+
+def _load_compiled(path: str) -> dict:
+    """Загрузить скомпилированную форму из памяти или разобрав YAML"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key in _compiled:
+        return _compiled[key]
+
+    with open(path, "rb") as source_file:
+        try:
+            raw = yaml.safe_load(source_file)
+        except yaml.YAMLError as e:
+            raise EnvironmentConfigError(f"Ошибка разбора {path}: {e}") from e
+    compiled = _compiled[key] = compile_config(raw)
+    return compiled
+
+
+def _make_target(name: str, definition: dict) -> TargetEnvironment:
+    variable = URL_OVERRIDE_PREFIX + name.upper().replace("-", "_")
+    base_url = os.environ.get(variable)
+    if base_url:
+        base_url = _validate_base_url(base_url, variable)
+    elif definition["base_url"]:
+        base_url = definition["base_url"]
+    else:
+        raise EnvironmentConfigError(
+            f"Для окружения '{name}' не задан адрес: укажите его в переменной окружения {variable}")
+    return TargetEnvironment(name, base_url, definition["timeout"], dict(definition["endpoints"]))
+
+
+def load_environments(path: str = DEFAULT_CONFIG_PATH) -> Dict[str, TargetEnvironment]:
+    """Все описанные окружения с учетом переопределений адресов из переменных окружения"""
+    compiled = _load_compiled(path)
+    return {name: _make_target(name, definition) for name, definition in compiled["environments"].items()}
+
+
+def get_target(name: Optional[str] = None, path: str = DEFAULT_CONFIG_PATH) -> TargetEnvironment:
+    """Окружение по имени (по умолчанию - указанное в default)"""
+    compiled = _load_compiled(path)
+    name = name or compiled["default"]
+    if name not in compiled["environments"]:
+        raise EnvironmentConfigError(
+            f"Неизвестное окружение '{name}'. Доступны: {', '.join(compiled['environments'])}")
+    return _make_target(name, compiled["environments"][name])
+
+
+def select_targets(names: Optional[str] = None, path: str = DEFAULT_CONFIG_PATH) -> List[TargetEnvironment]:
+    """Окружения из строки вида 'production,staging' или 'all'; пустая строка - окружение по умолчанию"""
+    if not names:
+        return [get_target(path=path)]
+    if names.strip() == "all":
+        return list(load_environments(path).values())
+    return [get_target(name.strip(), path) for name in names.split(",") if name.strip()]
+
+
+def format_matrix_report(results: Dict[str, List[tuple]], totals: Dict[str, tuple]) -> str:
+    """
+    Сводная таблица прогона на нескольких окружениях: строки - тесты, столбцы - окружения
+
+    Args:
+        results: Окружение -> список (тест, успех, длительность в секундах)
+        totals: Окружение -> (успешно, с ошибкой)
+    """
+    names = list(results)
+    test_names = [test_name for test_name, _, _ in results[names[0]]] if names else []
+    cells = {name: {test_name: (ok, duration) for test_name, ok, duration in rows}
+             for name, rows in results.items()}
+
+    lines = ["Тест".ljust(30) + "".join(name.rjust(16) for name in names)]
+    for test_name in test_names:
+        row = test_name[:29].ljust(30)
+        for name in names:
+            ok, duration = cells[name].get(test_name, (False, 0.0))
+            row += f"{'✅' if ok else '❌'} {duration:7.2f} с".rjust(16)
+        lines.append(row)
+    lines.append("Итого".ljust(30) + "".join(
+        f"{sum(duration for _, _, duration in results[name]):.2f} с".rjust(16) for name in names))
+    lines.append("Успешно".ljust(30) + "".join(
+        f"{totals[name][0]}/{sum(totals[name])}".rjust(16) for name in names))
+    return "\n".join(lines)
+
+
+# Плагин pytest: pytest --targets production,staging (или --targets all)
+def pytest_addoption(parser):
+    group = parser.getgroup("environments", "Матрица окружений")
+    group.addoption("--targets", default=os.environ.get("API_TARGETS", ""),
+                    help="Окружения для запуска через запятую или 'all' (по умолчанию - default из конфигурации)")
+
+
+def pytest_generate_tests(metafunc):
+    if "env_target" in metafunc.fixturenames:
+        targets = select_targets(metafunc.config.getoption("targets"))
+        metafunc.parametrize("env_target", targets, ids=[target.name for target in targets])
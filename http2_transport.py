@@ -0,0 +1,302 @@
+import importlib.util
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import DecodeError, MaxRetryError
+from urllib3.util.request import ACCEPT_ENCODING as REQUESTS_ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+try:
+    # Распаковщик Content-Encoding самого urllib3 (внутренний API): без него объем
+    # сжатых ответов requests по сети не измеряется и записывается как None
+    from urllib3.response import _get_decoder
+except ImportError:
+    _get_decoder = None
+
+try:
+    import httpx
+    HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+except ImportError:  # HTTP/2 транспорт необязателен: pip install "httpx[http2]" brotli zstandard
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+
+def http2_accept_encoding() -> str:
+    """Заголовок Accept-Encoding с алгоритмами, которые может распаковать httpx"""
+    encodings = []
+    # Предпочтительный порядок: zstd и brotli сжимают HTML лучше gzip
+    if importlib.util.find_spec("zstandard") is not None:
+        encodings.append("zstd")
+    if importlib.util.find_spec("brotli") is not None or importlib.util.find_spec("brotlicffi") is not None:
+        encodings.append("br")
+    encodings += ["gzip", "deflate"]
+    return ", ".join(encodings)
+
+
+def requests_accept_encoding() -> str:
+    """Заголовок Accept-Encoding с алгоритмами, которые может распаковать urllib3"""
+    return ", ".join(encoding.strip() for encoding in REQUESTS_ACCEPT_ENCODING.split(","))
+
+
+class TransferRecord:
+    """Объем передачи одного ответа"""
+
+    __slots__ = ("url", "status_code", "http_version", "content_encoding", "wire_bytes", "decoded_bytes")
+
+    def __init__(self, url: str, status_code: int, http_version: str, content_encoding: str,
+                 wire_bytes: Optional[int], decoded_bytes: int):
+        self.url = url
+        self.status_code = status_code
+        self.http_version = http_version
+        self.content_encoding = content_encoding
+        # None - объем по сети не измерен
+        self.wire_bytes = wire_bytes
+        self.decoded_bytes = decoded_bytes
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        if self.wire_bytes is None:
+            return None
+        return self.decoded_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+
+class _CountingRaw:
+    """
+    Обертка над ответом urllib3: считает байты тела до распаковки (wire_bytes)
+
+    urllib3 2.x не учитывает chunked ответы в raw.tell(), поэтому тело читается без
+    распаковки и распаковывается тем же распаковщиком, что использует urllib3.
+    Остальные атрибуты и методы передаются исходному ответу.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        # None - тело еще не прочитано через stream() или объем не удалось измерить
+        self.wire_bytes: Optional[int] = None
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def stream(self, amt: int = 2 ** 16, decode_content: Optional[bool] = None) -> Iterator[bytes]:
+        raw = self._raw
+        encoding = raw.headers.get("Content-Encoding", "").lower()
+        decoder = None
+        if decode_content and encoding:
+            if _get_decoder is None or not all(item.strip() in raw.CONTENT_DECODERS for item in encoding.split(",")):
+                yield from raw.stream(amt, decode_content=decode_content)
+                return
+            decoder = _get_decoder(encoding)
+
+        self.wire_bytes = 0
+        for chunk in raw.stream(amt, decode_content=False):
+            self.wire_bytes += len(chunk)
+            if decoder is None:
+                yield chunk
+                continue
+            data = self._decode(decoder.decompress, chunk)
+            if data:
+                yield data
+        if decoder is not None:
+            data = self._decode(lambda tail: decoder.decompress(tail) + decoder.flush(), b"")
+            if data:
+                yield data
+
+    def _decode(self, decompress, data: bytes) -> bytes:
+        try:
+            return decompress(data)
+        except Exception as e:
+            # requests ожидает от urllib3 DecodeError при поврежденном сжатом теле
+            raise DecodeError(f"Ошибка распаковки {self._raw.headers.get('Content-Encoding')}: {e}", e) from e
+
+
+class TransferCountingAdapter(HTTPAdapter):
+    """HTTPAdapter, ответы которого знают объем тела по сети (response.raw.wire_bytes)"""
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        response.raw = _CountingRaw(response.raw)
+        return response
+
+
+class TransferStats:
+    """
+    Статистика объема передачи: байты по сети против распакованных байт
+
+    По умолчанию хранятся только итоговые счетчики; список записей по каждому
+    ответу ведется, только если его запросили (keep_records=True).
+    """
+
+    def __init__(self, keep_records: bool = False):
+        self.records: Optional[List[TransferRecord]] = [] if keep_records else None
+        self.responses = 0
+        self.unmeasured = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.encodings: Dict[str, int] = {}
+        # Распакованные байты ответов с известным объемом по сети - для коэффициента сжатия
+        self._measured_decoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, response, wire_bytes: Optional[int] = None,
+               decoded_bytes: Optional[int] = None) -> TransferRecord:
+        """
+        Записать объем передачи ответа с уже прочитанным телом
+
+        Для Http2Response объем по сети берется из httpx, для ответа requests - из
+        TransferCountingAdapter; если он неизвестен, ответ считается неизмеренным.
+        """
+        if isinstance(response, Http2Response):
+            wire_bytes = response.num_bytes_downloaded
+        elif wire_bytes is None:
+            wire_bytes = getattr(getattr(response, "raw", None), "wire_bytes", None)
+        version = getattr(response, "http_version", None) or _requests_http_version(response)
+        record = TransferRecord(
+            str(response.url), response.status_code, version,
+            response.headers.get("Content-Encoding", "identity"), wire_bytes,
+            len(response.content) if decoded_bytes is None else decoded_bytes)
+        with self._lock:
+            self.responses += 1
+            self.decoded_bytes += record.decoded_bytes
+            self.encodings[record.content_encoding] = self.encodings.get(record.content_encoding, 0) + 1
+            if record.wire_bytes is None:
+                self.unmeasured += 1
+            else:
+                self.wire_bytes += record.wire_bytes
+                self._measured_decoded_bytes += record.decoded_bytes
+            if self.records is not None:
+                self.records.append(record)
+        return record
+
+    @property
+    def compressed_responses(self) -> int:
+        return self.responses - self.encodings.get("identity", 0)
+
+    @property
+    def compression_ratio(self) -> float:
+        return self._measured_decoded_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+    def format(self) -> str:
+        """Текстовый отчет для консоли и Allure"""
+        lines = []
+        for record in self.records or ():
+            wire = "?" if record.wire_bytes is None else record.wire_bytes
+            ratio = "?" if record.compression_ratio is None else f"{record.compression_ratio:.1f}"
+            lines.append(f"[{record.status_code}] {record.http_version} {record.content_encoding}: "
+                         f"{wire} -> {record.decoded_bytes} байт (x{ratio}) {record.url}")
+        lines.append(f"Итого: {self.responses} ответов, {self.wire_bytes} байт по сети, "
+                     f"{self.decoded_bytes} байт после распаковки (x{self.compression_ratio:.1f}); "
+                     f"кодировки: {self.encodings}")
+        if self.unmeasured:
+            lines.append(f"Объем по сети не измерен для {self.unmeasured} ответов")
+        return "\n".join(lines)
+
+
+def _requests_http_version(response) -> str:
+    version = getattr(getattr(response, "raw", None), "version", None)
+    return {10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2"}.get(version, "HTTP/1.1")
+
+
+class Http2Response:
+    """Ответ httpx с интерфейсом requests.Response, который используют клиент, обход каталога и парсер"""
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+        self.history = [Http2Response(hop) for hop in response.history]
+
+    @property
+    def encoding(self) -> Optional[str]:
+        return self._response.encoding
+
+    @encoding.setter
+    def encoding(self, value: str) -> None:
+        self._response.encoding = value
+
+    @property
+    def content(self) -> bytes:
+        return self._response.read()
+
+    @property
+    def text(self) -> str:
+        self._response.read()
+        return self._response.text
+
+    @property
+    def num_bytes_downloaded(self) -> int:
+        return self._response.num_bytes_downloaded
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False) -> Iterator:
+        if decode_unicode:
+            return self._response.iter_text(chunk_size)
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self) -> None:
+        self._response.close()
+
+    def __enter__(self) -> "Http2Response":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class Http2Session:
+    """
+    Замена requests.Session на HTTP/2 клиенте httpx: запросы мультиплексируются в одном соединении
+
+    В отличие от requests.Session, httpx.Client потокобезопасен, поэтому одну сессию можно
+    разделить между потоками бенчмарка и обхода каталога (см. ChitaiGorodAPI.factory).
+    Повторы по статусу ответа (429, 5xx) выполняются по той же политике urllib3 Retry,
+    что и у транспорта requests, чтобы сравнение транспортов было равноценным.
+    """
+
+    def __init__(self, max_connections: int = 10, retries: Optional[Retry] = None, verify: bool = False):
+        """
+        Args:
+            max_connections: Максимальное число соединений
+            retries: Политика повторов (None - без повторов); число повторов соединения
+                берется из retries.total
+            verify: Проверять ли сертификат; в httpx задается только при создании клиента
+        """
+        if httpx is None or not HTTP2_AVAILABLE:
+            raise ImportError('Для HTTP/2 транспорта установите: pip install "httpx[http2]" brotli zstandard')
+        self.retries = retries
+        self.verify = verify
+        self.client = httpx.Client(verify=verify, transport=httpx.HTTPTransport(
+            http2=True,
+            verify=verify,
+            retries=retries.total if retries is not None and retries.total else 0,
+            limits=httpx.Limits(max_connections=max_connections),
+        ))
+
+    def request(self, method: str, url: str, params=None, headers=None, timeout=None, verify=None,
+                allow_redirects: bool = True, stream: bool = False) -> Http2Response:
+        if verify is not None and verify != self.verify:
+            raise ValueError("verify для Http2Session задается при создании сессии")
+        request = self.client.build_request(method, url, params=params, headers=headers, timeout=timeout)
+        retry = self.retries
+        while True:
+            response = self.client.send(request, stream=stream, follow_redirects=allow_redirects)
+            if retry is None or not retry.is_retry(method.upper(), response.status_code,
+                                                   "Retry-After" in response.headers):
+                return Http2Response(response)
+            try:
+                retry = retry.increment(method.upper(), url)
+            except MaxRetryError:
+                # Как в urllib3: при raise_on_status=False возвращается последний ответ
+                if retry.raise_on_status:
+                    response.close()
+                    raise
+                return Http2Response(response)
+            response.close()
+            retry.sleep(response)
+
+    def get(self, url: str, **kwargs) -> Http2Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self) -> None:
+        self.client.close()
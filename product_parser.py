@@ -0,0 +1,280 @@
+import re
+from collections import deque
+from html.parser import HTMLParser
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set
+from urllib.parse import urljoin
+
+# Классы и атрибуты, по которым распознается карточка товара
+CARD_CLASSES = {"product-card", "book-item", "item-card", "catalog-item", "product-item"}
+CARD_ATTRIBUTES = ("data-product", "data-chg-product-id", "data-product-id")
+
+# Классы элементов с полями товара внутри карточки
+FIELD_CLASSES = {
+    "title": {"product-card__title", "product-card__name", "product-title", "book-item__title"},
+    "author": {"product-card__subtitle", "product-card__author", "product-author", "book-item__author"},
+    "price": {"product-price__value", "product-card__price", "product-price", "book-item__price", "price"},
+}
+
+# Поля, которые могут быть заданы data-атрибутами карточки
+DATA_ATTRIBUTES = {
+    "data-chg-product-name": "title",
+    "data-product-name": "title",
+    "data-chg-product-author": "author",
+    "data-product-author": "author",
+    "data-chg-product-price": "price",
+    "data-product-price": "price",
+}
+
+UNAVAILABLE_MARKERS = ("нет в наличии", "нет в продаже", "сообщить о поступлении", "товар закончился")
+AVAILABLE_MARKERS = ("купить", "в корзину", "оформить")
+
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                 "param", "source", "track", "wbr"}
+
+# Неявное закрытие элементов (упрощенно по HTML5): открываемый тег -> (закрываемые теги, границы поиска)
+_IMPLIED_END = {
+    "li": ({"li"}, {"ul", "ol"}),
+    "dt": ({"dt", "dd"}, {"dl"}),
+    "dd": ({"dt", "dd"}, {"dl"}),
+    "tr": ({"tr"}, {"table", "thead", "tbody", "tfoot"}),
+    "td": ({"td", "th"}, {"tr", "table"}),
+    "th": ({"td", "th"}, {"tr", "table"}),
+    "option": ({"option"}, {"select", "datalist"}),
+}
+# Блочные элементы, открытие которых закрывает незакрытый <p>
+_P_CLOSERS = {"address", "article", "aside", "blockquote", "div", "dl", "fieldset", "figure", "footer", "form",
+              "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+              "section", "table", "ul"}
+_P_SCOPE = {"button", "td", "th", "table", "li", "template"}
+
+_PRICE_RE = re.compile(r"\d[\d\s]*(?:[.,]\d{1,2})?")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def parse_price(text: str) -> Optional[float]:
+    """Преобразовать строку вида '1 299 ₽' в число"""
+    match = _PRICE_RE.search(text or "")
+    if not match:
+        return None
+    value = re.sub(r"\s", "", match.group()).replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class Product:
+    """Запись о товаре из результатов поиска или каталога"""
+
+    __slots__ = ("title", "author", "price", "available", "url")
+
+    def __init__(self, title: str = "", author: str = "", price: Optional[float] = None,
+                 available: bool = False, url: str = ""):
+        self.title = title
+        self.author = author
+        self.price = price
+        self.available = available
+        self.url = url
+
+    def as_dict(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Product) and self.as_dict() == other.as_dict()
+
+    def __hash__(self) -> int:
+        # Записи можно дедуплицировать через set/dict (товар повторяется на соседних страницах)
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self) -> str:
+        return (f"Product(title={self.title!r}, author={self.author!r}, price={self.price!r}, "
+                f"available={self.available!r}, url={self.url!r})")
+
+
+class _CardState:
+    """Промежуточное состояние разбираемой карточки"""
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.fields: Dict[str, List[str]] = {"title": [], "author": [], "price": []}
+        self.data: Dict[str, str] = {}
+        self.text: List[str] = []
+        self.url = ""
+
+
+class _OpenField:
+    """Открытый элемент с полем товара"""
+
+    __slots__ = ("depth", "name", "parts", "final")
+
+    def __init__(self, depth: int, name: str):
+        self.depth = depth
+        self.name = name
+        self.parts: List[str] = []
+        # Текст уже заменен вложенным совпадением и больше не дополняется
+        self.final = False
+
+
+class ProductParser(HTMLParser):
+    """Потоковый парсер карточек товаров: HTML подается частями через feed()"""
+
+    def __init__(self, base_url: str = ""):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.products: Deque[Product] = deque()
+        # Имена открытых элементов; глубина элемента - его номер в стеке, начиная с 1
+        self._stack: List[str] = []
+        self._card: Optional[_CardState] = None
+        self._fields: List[_OpenField] = []
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        classes = set((attributes.get("class") or "").split())
+        self._close_implied(tag)
+        self._boundary()
+        if tag in VOID_ELEMENTS:
+            if self._card is not None:
+                self._read_data_attributes(attributes)
+            return
+        self._stack.append(tag)
+        depth = len(self._stack)
+
+        if self._card is None:
+            if classes & CARD_CLASSES or any(name in attributes for name in CARD_ATTRIBUTES):
+                self._card = _CardState(depth)
+                self._read_data_attributes(attributes)
+                if tag == "a" and attributes.get("href"):
+                    self._card.url = attributes["href"]
+            return
+
+        self._read_data_attributes(attributes)
+        if tag == "a" and attributes.get("href") and not self._card.url:
+            self._card.url = attributes["href"]
+        for field, field_classes in FIELD_CLASSES.items():
+            if classes & field_classes:
+                self._fields.append(_OpenField(depth, field))
+                break
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        self._boundary()
+        # Закрывающий тег без открытого элемента с таким именем игнорируется, как в браузере
+        self._pop_to({tag})
+
+    def handle_data(self, data):
+        if self._card is None:
+            return
+        self._card.text.append(data)
+        if self._fields and not self._fields[-1].final:
+            self._fields[-1].parts.append(data)
+
+    def close(self):
+        super().close()
+        self._truncate(0)
+
+    def _close_implied(self, tag: str) -> None:
+        """Закрыть элементы, которые HTML закрывает неявно при открытии tag (<li> после <li> и т.п.)"""
+        if tag in _P_CLOSERS:
+            self._pop_to({"p"}, _P_SCOPE)
+        implied = _IMPLIED_END.get(tag)
+        if implied:
+            self._pop_to(*implied)
+
+    def _pop_to(self, names: Set[str], boundaries: Set[str] = frozenset()) -> None:
+        """Закрыть ближайший открытый элемент из names вместе со всеми вложенными в него"""
+        for index in range(len(self._stack) - 1, -1, -1):
+            name = self._stack[index]
+            if name in names:
+                self._truncate(index)
+                return
+            if name in boundaries:
+                return
+
+    def _truncate(self, depth: int) -> None:
+        del self._stack[depth:]
+        while self._fields and self._fields[-1].depth > depth:
+            self._close_field(self._fields.pop())
+        if self._card is not None and self._card.depth > depth:
+            self._finish_card()
+
+    def _close_field(self, field: _OpenField) -> None:
+        outer = next((item for item in reversed(self._fields) if item.name == field.name), None)
+        if outer is not None:
+            # Вложенное совпадение точнее внешнего: в "старая цена / цена" берется значение цены
+            outer.parts = field.parts
+            outer.final = True
+        else:
+            self._card.fields[field.name].append("".join(field.parts))
+
+    def _boundary(self) -> None:
+        # Границы элементов (в том числе <br>) разделяют слова; части одного текста склеиваются
+        if self._card is None:
+            return
+        self._card.text.append(" ")
+        if self._fields and not self._fields[-1].final:
+            self._fields[-1].parts.append(" ")
+
+    def _read_data_attributes(self, attributes: Dict[str, Optional[str]]) -> None:
+        for name, field in DATA_ATTRIBUTES.items():
+            value = attributes.get(name)
+            if value and field not in self._card.data:
+                self._card.data[field] = value
+
+    def _finish_card(self) -> None:
+        card, self._card = self._card, None
+        self._fields = []
+
+        def field_value(name: str) -> str:
+            text = card.data.get(name) or " ".join(card.fields[name])
+            return _SPACES_RE.sub(" ", text).strip()
+
+        title = field_value("title")
+        if not title:
+            return
+        price = parse_price(field_value("price"))
+        card_text = _SPACES_RE.sub(" ", "".join(card.text)).lower()
+        if any(marker in card_text for marker in UNAVAILABLE_MARKERS):
+            available = False
+        else:
+            available = price is not None or any(marker in card_text for marker in AVAILABLE_MARKERS)
+        url = urljoin(self.base_url, card.url) if card.url else ""
+        self.products.append(Product(title, field_value("author"), price, available, url))
+
+
+def parse_products(chunks: Iterable[str], base_url: str = "") -> Iterator[Product]:
+    """Разобрать HTML, поступающий частями, и выдавать товары по мере готовности карточек"""
+    parser = ProductParser(base_url)
+    for chunk in chunks:
+        parser.feed(chunk)
+        while parser.products:
+            yield parser.products.popleft()
+    parser.close()
+    while parser.products:
+        yield parser.products.popleft()
+
+
+def parse_response(response, chunk_size: int = 64 * 1024) -> Iterator[Product]:
+    """Разобрать товары из потокового ответа requests (stream=True)"""
+    # Без charset в Content-Type requests выбирает ISO-8859-1, что портит кириллицу
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        response.encoding = "utf-8"
+    return parse_products(response.iter_content(chunk_size, decode_unicode=True), response.url)
+
+
+def query_match_ratio(products: Iterable[Product], query: str) -> float:
+    """Доля товаров, у которых название или автор содержит хотя бы одно слово запроса"""
+    words = [word for word in query.lower().split() if len(word) > 2] or [query.lower()]
+    total = matched = 0
+    for product in products:
+        total += 1
+        text = f"{product.title} {product.author}".lower()
+        matched += any(word in text for word in words)
+    return matched / total if total else 0.0
+
+
+def price_outliers(products: Iterable[Product], min_price: float = 1.0,
+                   max_price: float = 500000.0) -> List[Product]:
+    """Товары в наличии без цены или с ценой вне допустимого диапазона"""
+    return [product for product in products
+            if product.available and (product.price is None or not min_price <= product.price <= max_price)]
@@ -0,0 +1,331 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+import allure
+import pytest
+
+# Число кадров стека tracemalloc: для отчета по строкам достаточно одного, больше заметно замедляет тесты
+TRACEMALLOC_FRAMES = 1
+
+# Настройки профилирования пакетов запросов; заполняются плагином или configure()
+_settings: Dict[str, object] = {"output_dir": None, "sample_interval": 0.005, "cprofile": False, "top": 10}
+
+# Стек активных профилировщиков для корректной работы вложенных замеров. tracemalloc и
+# семплирование общие для процесса, поэтому все активные замеры должны принадлежать одному потоку
+_active: List["ResourceProfiler"] = []
+_active_lock = threading.Lock()
+# Число активных замеров, использующих tracemalloc, и признак того, что его запустили замеры
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+# Служебные модули, выделения памяти в которых не показываются в отчете
+_ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+# Функции, в которых поток ждет (блокировку, очередь, сокет, сон), если нет счетчика CPU потока
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("threading.py", "join"),
+    ("threading.py", "run"), ("queue.py", "get"), ("selectors.py", "select"), ("socket.py", "readinto"),
+    ("socket.py", "accept"), ("ssl.py", "read"), ("ssl.py", "recv_into"), ("thread.py", "_worker"),
+    ("_base.py", "wait"), ("_base.py", "result"), ("time.py", "sleep"),
+}
+
+
+def _thread_cpu_time(native_id: Optional[int]) -> Optional[float]:
+    """Процессорное время потока по его системному id (Linux); None - недоступно"""
+    if native_id is None or not sys.platform.startswith("linux"):
+        return None
+    try:
+        # Часы CPU потока Linux: MAKE_THREAD_CPUCLOCK(tid, CPUCLOCK_SCHED); для завершенного потока - EINVAL
+        return time.clock_gettime(((~native_id) << 3) | 6)
+    except OSError:
+        return None
+
+
+def _is_idle_frame(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")[:150] or "profile"
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профилировщик CPU: периодически снимает стеки потоков, которые выполнялись
+
+    Поток попадает в семпл, только если его процессорное время выросло с прошлого семпла
+    (на Linux), иначе - если он не стоит в ожидании (блокировка, очередь, сокет, сон).
+    Простаивающие рабочие потоки пулов не вытесняют из отчета реальную работу.
+    """
+
+    THREAD_NAME = "sampling-profiler"
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._cpu_times: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            threads = {thread.ident: thread for thread in threading.enumerate()}
+            names = {ident: thread.name for ident, thread in threads.items()}
+            for ident, frame in sys._current_frames().items():
+                # Потоки профилировщиков (в том числе вложенных) в статистику не попадают
+                if names.get(ident, "").startswith(self.THREAD_NAME):
+                    continue
+                if not self._is_running(ident, threads.get(ident), frame):
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def _is_running(self, ident: int, thread: Optional[threading.Thread], frame) -> bool:
+        cpu_time = _thread_cpu_time(getattr(thread, "native_id", None))
+        if cpu_time is not None:
+            previous = self._cpu_times.get(ident)
+            self._cpu_times[ident] = cpu_time
+            # Первый семпл потока только запоминает его время; дальше нужен прирост CPU
+            if previous is None or cpu_time <= previous:
+                return False
+        # Короткое пробуждение ожидающего потока тоже не считается работой
+        return not _is_idle_frame(frame)
+
+    def hot_functions(self, top: int) -> List[Tuple[str, int, int]]:
+        """Функции с наибольшим числом собственных семплов: (функция, собственные, включительные)"""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        return [(label, count, inclusive[label]) for label, count in own.most_common(top)]
+
+    def write_collapsed(self, path: str) -> str:
+        """Сохранить стеки в формате collapsed stack (flamegraph.pl, speedscope)"""
+        with open(path, "w", encoding="utf-8") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(";".join(label.replace(";", ",") for label in stack) + f" {count}\n")
+        return path
+
+
+class ProfileResult:
+    """Результат профилирования теста или пакета запросов"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.duration = 0.0
+        self.peak_bytes = 0
+        self.top_allocations: List[str] = []
+        self.hot_functions: List[Tuple[str, int, int]] = []
+        self.files: List[str] = []
+
+    def format(self) -> str:
+        """Текстовый отчет для консоли и Allure"""
+        lines = [f"Длительность: {self.duration:.2f} с",
+                 f"Пиковая память (tracemalloc): {self.peak_bytes / 1024 / 1024:.1f} МБ",
+                 "Крупнейшие источники роста памяти:"]
+        lines += [f"  {line}" for line in self.top_allocations] or ["  нет данных"]
+        lines.append("Горячие функции по CPU (собственные / включительные семплы, без ожидающих потоков):")
+        lines += [f"  {own:6d} / {inclusive:6d}  {label}" for label, own, inclusive in self.hot_functions] \
+            or ["  нет данных"]
+        lines.append("Файлы: " + ", ".join(self.files))
+        return "\n".join(lines)
+
+
+class ResourceProfiler:
+    """Замер памяти (tracemalloc) и процессорного времени (семплирование, cProfile) для блока кода"""
+
+    def __init__(self, name: str, output_dir: str = "profiles", sample_interval: float = 0.005,
+                 use_cprofile: bool = False, top: int = 10):
+        """
+        Args:
+            name: Имя замера (используется в именах файлов)
+            output_dir: Каталог для файлов .collapsed и .pstats
+            sample_interval: Интервал семплирования стеков, секунды
+            use_cprofile: Дополнительно собрать детерминированный профиль cProfile (.pstats)
+            top: Число строк в списках источников памяти и горячих функций
+        """
+        self.output_dir = output_dir
+        self.top = top
+        self.result = ProfileResult(name)
+        self._sampler = SamplingProfiler(sample_interval)
+        self._use_cprofile = use_cprofile
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._thread_id: Optional[int] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak_floor = 0
+        self._start = 0.0
+
+    def __enter__(self) -> "ResourceProfiler":
+        global _tracemalloc_users, _tracemalloc_owned
+        self._thread_id = threading.get_ident()
+        with _active_lock:
+            if any(profiler._thread_id != self._thread_id for profiler in _active):
+                raise RuntimeError(
+                    f"Замер '{self.result.name}' запущен, пока в другом потоке идет замер "
+                    f"'{_active[-1].result.name}': tracemalloc и семплирование общие для процесса, "
+                    f"одновременные замеры из разных потоков не поддерживаются")
+            if _active:
+                # Пик внешнего замера сохраняется, т.к. вложенный замер сбрасывает счетчик пика
+                _active[-1]._peak_floor = max(_active[-1]._peak_floor, tracemalloc.get_traced_memory()[1])
+            _active.append(self)
+            if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                _tracemalloc_owned = True
+            _tracemalloc_users += 1
+
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+        # cProfile нельзя вложить в уже работающий профилировщик
+        if self._use_cprofile and sys.getprofile() is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        result = self.result
+        result.duration = time.perf_counter() - self._start
+        self._sampler.stop()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+        result.peak_bytes = max(tracemalloc.get_traced_memory()[1], self._peak_floor)
+        snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        for stat in snapshot.compare_to(self._snapshot, "lineno")[:self.top]:
+            frame = stat.traceback[0]
+            result.top_allocations.append(
+                f"{stat.size_diff / 1024:+10.1f} КБ ({stat.count_diff:+d} блоков)  "
+                f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        self._snapshot = None
+
+        global _tracemalloc_users, _tracemalloc_owned
+        with _active_lock:
+            _active.remove(self)
+            if _active:
+                _active[-1]._peak_floor = max(_active[-1]._peak_floor, result.peak_bytes)
+            _tracemalloc_users -= 1
+            # tracemalloc останавливается последним замером и только если его запустили замеры
+            if _tracemalloc_users == 0 and _tracemalloc_owned:
+                tracemalloc.stop()
+                _tracemalloc_owned = False
+
+        result.hot_functions = self._sampler.hot_functions(self.top)
+        os.makedirs(self.output_dir, exist_ok=True)
+        base_path = os.path.join(self.output_dir, _safe_name(result.name))
+        result.files.append(self._sampler.write_collapsed(base_path + ".collapsed"))
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(base_path + ".pstats")
+            result.files.append(base_path + ".pstats")
+
+
+def configure(output_dir: Optional[str], sample_interval: float = 0.005, use_cprofile: bool = False,
+              top: int = 10) -> None:
+    """Включить (output_dir) или выключить (None) профилирование пакетов запросов"""
+    _settings.update(output_dir=output_dir, sample_interval=sample_interval, cprofile=use_cprofile, top=top)
+
+
+def profile_batch(name: str):
+    """
+    Профилировать пакет запросов, если профилирование включено; иначе пустой контекст
+
+    Внутри замера теста имя дополняется именем этого замера (nodeid теста или окружение
+    и тест в run_all_tests), чтобы файлы разных тестов и окружений не перезаписывались.
+    """
+    if not _settings["output_dir"]:
+        return nullcontext()
+    thread_id = threading.get_ident()
+    with _active_lock:
+        outer = next((profiler for profiler in reversed(_active) if profiler._thread_id == thread_id), None)
+    if outer is not None:
+        name = f"{outer.result.name}--{name}"
+    return ResourceProfiler(name, _settings["output_dir"], _settings["sample_interval"],
+                            _settings["cprofile"], _settings["top"])
+
+
+# Плагин pytest: pytest --profile-resources [--profile-dir profiles] [--profile-cprofile]
+def pytest_addoption(parser):
+    group = parser.getgroup("resource-profiling", "Профилирование памяти и CPU тестов")
+    group.addoption("--profile-resources", action="store_true", default=False,
+                    help="Замерять пиковую память, источники выделений и горячие функции каждого теста")
+    group.addoption("--profile-dir", default="profiles", help="Каталог для файлов .collapsed и .pstats")
+    group.addoption("--profile-interval", type=float, default=0.005, help="Интервал семплирования, секунды")
+    group.addoption("--profile-cprofile", action="store_true", default=False,
+                    help="Дополнительно записывать детерминированный профиль cProfile (.pstats)")
+
+
+def pytest_configure(config):
+    if config.getoption("profile_resources"):
+        configure(config.getoption("profile_dir"), config.getoption("profile_interval"),
+                  config.getoption("profile_cprofile"))
+        config._resource_profiles = []
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    if not hasattr(item.config, "_resource_profiles"):
+        yield
+        return
+    profiler = profile_batch(item.nodeid)
+    with profiler:
+        yield
+    allure.attach(profiler.result.format(), "Профиль ресурсов теста", allure.attachment_type.TEXT)
+    item.config._resource_profiles.append(profiler.result)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    results = getattr(config, "_resource_profiles", None)
+    if not results:
+        return
+    terminalreporter.section("Профиль ресурсов")
+    for result in sorted(results, key=lambda item: item.peak_bytes, reverse=True):
+        hottest = result.hot_functions[0][0] if result.hot_functions else "-"
+        terminalreporter.write_line(f"{result.peak_bytes / 1024 / 1024:8.1f} МБ  {result.duration:7.2f} с  "
+                                    f"{result.name}  [{hottest}]")
+    terminalreporter.write_line(f"Файлы профилей: {config.getoption('profile_dir')}")
+
+
+def pytest_unconfigure(config):
+    if hasattr(config, "_resource_profiles"):
+        configure(None)
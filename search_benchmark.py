@@ -0,0 +1,246 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from concurrent_batch import ThreadLocalClient, run_bounded
+from resource_profiling import profile_batch
+
+# Перцентили, выводимые в отчете
+REPORT_PERCENTILES = (50, 90, 95, 99)
+
+# Относительная точность корзин гистограммы задержек (2%)
+_BUCKET_GROWTH = 1.02
+_LOG_GROWTH = math.log(_BUCKET_GROWTH)
+
+# ISBN-10 (9 цифр и контрольный символ, возможно X) или ISBN-13 после удаления дефисов и пробелов
+_ISBN_RE = re.compile(r"^(?:\d{9}[\dXx]|\d{13})$")
+_ISBN_SEPARATORS_RE = re.compile(r"[\s\-]")
+_NUMERIC_RE = re.compile(r"^[\d\s.,\-/]+$")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_CYRILLIC_RE = re.compile(r"[А-Яа-яЁё]")
+
+
+def classify_query(query: str) -> str:
+    """Определить класс запроса, если он не задан в корпусе"""
+    if _ISBN_RE.match(_ISBN_SEPARATORS_RE.sub("", query)):
+        return "isbn"
+    if _NUMERIC_RE.match(query):
+        return "numeric"
+    words = query.split()
+    if len(words) >= 3:
+        return "long"
+    if len(query) <= 3:
+        return "short"
+    if _LATIN_RE.search(query) and not _CYRILLIC_RE.search(query):
+        return "latin"
+    return "cyrillic"
+
+
+def read_corpus(path: str) -> Iterator[Tuple[str, float, str]]:
+    """
+    Построчно читать корпус запросов, не загружая его в память целиком
+
+    Формат строки: запрос[<TAB>вес[<TAB>класс]]. Пустые строки и строки,
+    начинающиеся с '#', пропускаются.
+    """
+    with open(path, encoding="utf-8") as corpus:
+        for line in corpus:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.split("\t")
+            query = parts[0].strip()
+            weight = float(parts[1]) if len(parts) > 1 and parts[1].strip() else 1.0
+            query_class = parts[2].strip() if len(parts) > 2 and parts[2].strip() else classify_query(query)
+            yield query, weight, query_class
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с логарифмическими корзинами: память не зависит от числа замеров"""
+
+    def __init__(self):
+        self.buckets: Dict[int, float] = {}
+        self.total_weight = 0.0
+        self.max_ms = 0.0
+
+    def add(self, latency_ms: float, weight: float = 1.0) -> None:
+        index = int(math.log(max(latency_ms, 1.0)) / _LOG_GROWTH)
+        self.buckets[index] = self.buckets.get(index, 0.0) + weight
+        self.total_weight += weight
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def percentile(self, percent: float) -> float:
+        """Взвешенный перцентиль (верхняя граница корзины, мс)"""
+        if not self.total_weight:
+            return 0.0
+        threshold = self.total_weight * percent / 100.0
+        accumulated = 0.0
+        for index in sorted(self.buckets):
+            accumulated += self.buckets[index]
+            if accumulated >= threshold:
+                return min(_BUCKET_GROWTH ** (index + 1), self.max_ms)
+        return self.max_ms
+
+
+class QueryClassStats:
+    """Статистика по одному классу запросов"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.error_weight = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """Взвешенная доля ошибок - с теми же весами, что и перцентили"""
+        total_weight = self.histogram.total_weight
+        return self.error_weight / total_weight if total_weight else 0.0
+
+
+class BenchmarkReport:
+    """Итоги бенчмарка поиска"""
+
+    def __init__(self, slowest_count: int = 10):
+        self.classes: Dict[str, QueryClassStats] = {}
+        self.overall = QueryClassStats()
+        self.slowest_count = slowest_count
+        self._slowest: List[Tuple[float, str, int, int]] = []
+        self.duration = 0.0
+
+    def add(self, query: str, page: int, query_class: str, weight: float,
+            latency_ms: float, status_code: int) -> None:
+        is_error = status_code >= 400
+        for stats in (self.classes.setdefault(query_class, QueryClassStats()), self.overall):
+            stats.requests += 1
+            stats.errors += is_error
+            stats.error_weight += weight if is_error else 0.0
+            stats.histogram.add(latency_ms, weight)
+
+        # Куча фиксированного размера с самыми медленными запросами
+        entry = (latency_ms, query, page, status_code)
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self) -> List[Tuple[float, str, int, int]]:
+        return sorted(self._slowest, reverse=True)
+
+    @property
+    def throughput(self) -> float:
+        return self.overall.requests / self.duration if self.duration else 0.0
+
+    def format(self) -> str:
+        """Текстовый отчет для консоли и Allure"""
+        header = "Класс".ljust(12) + "Запросов".rjust(10) + "Ошибок".rjust(9) + "".join(
+            f"p{percent} мс".rjust(11) for percent in REPORT_PERCENTILES) + "Макс мс".rjust(11)
+        lines = [header]
+        rows = sorted(self.classes.items()) + [("ВСЕГО", self.overall)]
+        for name, stats in rows:
+            lines.append(name.ljust(12) + str(stats.requests).rjust(10)
+                         + f"{stats.error_rate:.1%}".rjust(9)
+                         + "".join(f"{stats.histogram.percentile(percent):.0f}".rjust(11)
+                                   for percent in REPORT_PERCENTILES)
+                         + f"{stats.histogram.max_ms:.0f}".rjust(11))
+        lines.append("")
+        lines.append(f"Длительность: {self.duration:.1f} с, пропускная способность: {self.throughput:.1f} запр/с")
+        lines.append(f"Самые медленные запросы (топ-{self.slowest_count}):")
+        for latency_ms, query, page, status_code in self.slowest:
+            lines.append(f"  {latency_ms:8.0f} мс  [{status_code}] '{query}' стр. {page}")
+        return "\n".join(lines)
+
+
+class SearchBenchmark:
+    """Конкурентный прогон корпуса поисковых запросов через API клиент"""
+
+    def __init__(self, client_factory: Callable, concurrency: int = 8, pages: int = 1,
+                 slowest_count: int = 10):
+        """
+        Args:
+            client_factory: Фабрика API клиента с методом search_products(query, page).
+                Клиент не должен повторять запросы по статусу ответа, иначе задержка
+                включает скрытые паузы между попытками (ChitaiGorodAPI(retries=0))
+            concurrency: Число параллельных потоков
+            pages: Сколько страниц результатов запрашивать для каждого запроса
+            slowest_count: Размер списка самых медленных запросов в отчете
+        """
+        self.client_factory = client_factory
+        self.concurrency = concurrency
+        self.pages = pages
+        self.slowest_count = slowest_count
+        self._clients = ThreadLocalClient(client_factory)
+
+    def _execute(self, task: Tuple[str, int, float, str]) -> Tuple[float, int]:
+        query, page = task[0], task[1]
+        start = time.perf_counter()
+        try:
+            status_code = self._clients.get().search_products(query, page=page).status_code
+        except Exception:
+            status_code = 599
+        return (time.perf_counter() - start) * 1000.0, status_code
+
+    def _tasks(self, corpus: Iterable[Tuple[str, float, str]]) -> Iterator[Tuple[str, int, float, str]]:
+        for query, weight, query_class in corpus:
+            for page in range(1, self.pages + 1):
+                yield query, page, weight, query_class
+
+    def run(self, corpus: Iterable[Tuple[str, float, str]], output_path: str) -> BenchmarkReport:
+        """
+        Выполнить бенчмарк, записывая каждый результат в JSONL файл по мере получения
+
+        В полете одновременно находится не больше 2 * concurrency задач, поэтому
+        потребление памяти не зависит от размера корпуса.
+        """
+        report = BenchmarkReport(self.slowest_count)
+        max_in_flight = self.concurrency * 2
+        tasks = self._tasks(corpus)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        start = time.perf_counter()
+        with profile_batch("search-benchmark"), open(output_path, "w", encoding="utf-8") as output, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for task, (latency_ms, status_code) in run_bounded(
+                    executor, self._execute, lambda: next(tasks, None), max_in_flight):
+                query, page, weight, query_class = task
+                report.add(query, page, query_class, weight, latency_ms, status_code)
+                output.write(json.dumps({
+                    "query": query, "page": page, "class": query_class, "weight": weight,
+                    "latency_ms": round(latency_ms, 1), "status": status_code,
+                }, ensure_ascii=False) + "\n")
+
+        report.duration = time.perf_counter() - start
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> BenchmarkReport:
+    """Запуск бенчмарка из командной строки"""
+    from test_api import ChitaiGorodAPI
+
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска Читай-город по корпусу запросов")
+    parser.add_argument("corpus", help="Файл корпуса: запрос[<TAB>вес[<TAB>класс]]")
+    parser.add_argument("--output", default="benchmark_results/search_benchmark.jsonl",
+                        help="JSONL файл с результатами каждого запроса")
+    parser.add_argument("--concurrency", type=int, default=8, help="Число параллельных потоков")
+    parser.add_argument("--pages", type=int, default=3, help="Число страниц результатов на запрос")
+    parser.add_argument("--top", type=int, default=10, help="Число самых медленных запросов в отчете")
+    parser.add_argument("--http2", action="store_true",
+                        help="Общий HTTP/2 клиент для всех потоков (нужен httpx[http2])")
+    args = parser.parse_args(argv)
+
+    with ChitaiGorodAPI.factory(args.http2, retries=0, max_connections=args.concurrency) as client_factory:
+        benchmark = SearchBenchmark(client_factory, args.concurrency, args.pages, args.top)
+        report = benchmark.run(read_corpus(args.corpus), args.output)
+    print(report.format())
+    return report
+
+
+if __name__ == "__main__":
+    main()
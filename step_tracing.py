@@ -0,0 +1,215 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import allure_commons
+import pytest
+import requests
+
+try:
+    from selenium.webdriver.remote.webdriver import WebDriver
+except ImportError:  # UI зависимости не установлены - трассируются только API шаги
+    WebDriver = None
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 транспорт необязателен
+    httpx = None
+
+
+class Tracer:
+    """Сборщик событий трассировки для одного прогона"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter_ns()
+        self._open_steps: Dict[str, tuple] = {}
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._patched: List[tuple] = []
+
+    def _now_us(self) -> float:
+        return (time.perf_counter_ns() - self._origin) / 1000.0
+
+    def _tid(self) -> int:
+        """Короткий номер текущего потока (в просмотрщике потоки отображаются отдельными дорожками)"""
+        ident = threading.get_ident()
+        tid = self._threads.get(ident)
+        if tid is None:
+            with self._lock:
+                tid = self._threads.setdefault(ident, len(self._threads) + 1)
+                self.events.append({"ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": tid,
+                                    "args": {"name": threading.current_thread().name}})
+        return tid
+
+    def add_span(self, name: str, category: str, start_us: float, end_us: float,
+                 args: Optional[Dict[str, Any]] = None, tid: Optional[int] = None) -> None:
+        """Добавить завершенное событие (ph=X)"""
+        event = {"ph": "X", "name": name, "cat": category, "ts": start_us, "dur": end_us - start_us,
+                 "pid": os.getpid(), "tid": tid if tid is not None else self._tid()}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """Контекстный менеджер для замера произвольного участка"""
+        tid = self._tid()
+        start = self._now_us()
+        try:
+            yield args
+        finally:
+            self.add_span(name, category, start, self._now_us(), args, tid)
+
+    # Хуки allure_commons: вызываются при входе и выходе из каждого allure.step
+    @allure_commons.hookimpl
+    def start_step(self, uuid, title, params):
+        self._open_steps[uuid] = (self._now_us(), title, self._tid())
+
+    @allure_commons.hookimpl
+    def stop_step(self, uuid, exc_type, exc_val, exc_tb):
+        opened = self._open_steps.pop(uuid, None)
+        if opened is None:
+            return
+        start, title, tid = opened
+        args = {"error": exc_type.__name__} if exc_type else None
+        self.add_span(title, "step", start, self._now_us(), args, tid)
+
+    def _patch(self, owner, attribute: str, wrapper_factory) -> None:
+        original = getattr(owner, attribute)
+        setattr(owner, attribute, functools.wraps(original)(wrapper_factory(original)))
+        self._patched.append((owner, attribute, original))
+
+    def install(self) -> "Tracer":
+        """Подключить трассировку шагов, HTTP запросов и команд WebDriver"""
+        allure_commons.plugin_manager.register(self)
+        tracer = self
+
+        def trace_send(original):
+            def send(session, request, **kwargs):
+                with tracer.span(f"HTTP {request.method} {request.path_url.split('?')[0]}", "http",
+                                 url=request.url) as args:
+                    response = original(session, request, **kwargs)
+                    args["status"] = response.status_code
+                    return response
+            return send
+
+        self._patch(requests.Session, "send", trace_send)
+
+        if httpx is not None:
+            # Запросы HTTP/2 транспорта (Http2Session) идут через httpx.Client.send
+            def trace_httpx_send(original):
+                def send(client, request, **kwargs):
+                    with tracer.span(f"HTTP {request.method} {request.url.path}", "http",
+                                     url=str(request.url)) as args:
+                        response = original(client, request, **kwargs)
+                        args["status"] = response.status_code
+                        args["http_version"] = response.http_version
+                        return response
+                return send
+
+            self._patch(httpx.Client, "send", trace_httpx_send)
+
+        if WebDriver is not None:
+            def trace_execute(original):
+                def execute(driver, driver_command, params=None):
+                    with tracer.span(f"WebDriver {driver_command}", "webdriver"):
+                        return original(driver, driver_command, params)
+                return execute
+
+            self._patch(WebDriver, "execute", trace_execute)
+        return self
+
+    def uninstall(self) -> None:
+        """Отключить трассировку и вернуть исходные методы"""
+        if allure_commons.plugin_manager.is_registered(self):
+            allure_commons.plugin_manager.unregister(self)
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        self._patched = []
+
+    def write(self, path: str) -> str:
+        """Сохранить трассировку в JSON формате Chrome Trace Event"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, trace_file, ensure_ascii=False)
+        return path
+
+
+@contextmanager
+def tracing(path: str):
+    """Трассировать блок кода (например, run_all_tests) и записать результат в path"""
+    tracer = Tracer().install()
+    try:
+        yield tracer
+    finally:
+        tracer.uninstall()
+        tracer.write(path)
+
+
+# Переменная окружения для трассировки запусков без pytest (run_all_tests, run_matrix):
+# STEP_TRACE=traces/run.json python test_api.py
+TRACE_ENV_VAR = "STEP_TRACE"
+
+
+def tracing_from_env():
+    """tracing() в файл из переменной STEP_TRACE или пустой контекст, если она не задана"""
+    path = os.environ.get(TRACE_ENV_VAR)
+    if not path:
+        return nullcontext()
+    print(f"Трассировка шагов будет сохранена: {path}")
+    return tracing(path)
+
+
+# Плагин pytest: pytest --trace-steps [--trace-dir traces]
+def pytest_addoption(parser):
+    group = parser.getgroup("step-tracing", "Трассировка шагов в формате Chrome Trace Event")
+    group.addoption("--trace-steps", action="store_true", default=False,
+                    help="Записать временную шкалу шагов, HTTP запросов и команд WebDriver")
+    group.addoption("--trace-dir", default="traces", help="Каталог для файлов трассировки")
+
+
+def pytest_configure(config):
+    if config.getoption("trace_steps"):
+        config._step_tracer = Tracer().install()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    tracer = getattr(item.config, "_step_tracer", None)
+    if tracer is None:
+        yield
+        return
+    with tracer.span(item.nodeid, "test"):
+        yield
+
+
+def _write_trace(config) -> Optional[str]:
+    """Записать трассировку один раз за сессию и вернуть путь к файлу"""
+    tracer = getattr(config, "_step_tracer", None)
+    if tracer is None or getattr(config, "_step_trace_path", None):
+        return None
+    path = os.path.join(config.getoption("trace_dir"),
+                        f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    config._step_trace_path = tracer.write(path)
+    return path
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    path = _write_trace(config)
+    if path:
+        terminalreporter.write_line(f"Трассировка шагов сохранена: {path}")
+
+
+def pytest_unconfigure(config):
+    tracer = getattr(config, "_step_tracer", None)
+    if tracer is None:
+        return
+    tracer.uninstall()
+    # Без терминального отчета (например, -p no:terminal) трассировка записывается здесь
+    _write_trace(config)
@@ -1,21 +1,46 @@
 import pytest
 import time
+import threading
 import sys
 import os
 import requests
 import allure
 from datetime import datetime
-from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from urllib3.util.retry import Retry
+from search_benchmark import SearchBenchmark, read_corpus
+from catalog_crawler import CatalogCrawler
+from product_parser import parse_response, price_outliers, query_match_ratio
+from environments import format_matrix_report, get_target, select_targets
+from resource_profiling import ResourceProfiler, configure as configure_profiling
+from step_tracing import tracing_from_env
+from http2_transport import (HTTP2_AVAILABLE, Http2Session, TransferCountingAdapter, TransferStats,
+                             http2_accept_encoding, requests_accept_encoding)
 
 # Добавляем корневую папку в путь Python
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Базовые настройки API
-BASE_URL = "https://www.chitai-gorod.ru"
-API_TIMEOUT = 30
+# Базовые настройки API (окружение по умолчанию из test_api/config/environment.yaml.py)
+DEFAULT_TARGET = get_target()
+BASE_URL = DEFAULT_TARGET.base_url
+API_TIMEOUT = DEFAULT_TARGET.timeout
 TEST_SEARCH_QUERY = "книга"
 
+# Настройки бенчмарка поиска
+SEARCH_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_api", "data", "search_queries.tsv")
+SEARCH_BENCHMARK_OUTPUT = "benchmark_results/search_benchmark_{target}.jsonl"
+SEARCH_BENCHMARK_CONCURRENCY = 4
+SEARCH_BENCHMARK_PAGES = 2
+# Общий HTTP/2 клиент для всех потоков бенчмарка и обхода каталога (нужен httpx[http2])
+BATCH_HTTP2 = False
+
+# Настройки обхода каталога
+CRAWL_CONCURRENCY = 4
+CRAWL_REQUESTS_PER_SECOND = 5.0
+CRAWL_MAX_DEPTH = 1
+CRAWL_MAX_PAGES = 100
+CRAWL_MAX_PRODUCTS = 100
+
 
 class MockResponse:
     """Mock объект для замены ответов при ошибках"""
@@ -29,27 +54,36 @@ class MockResponse:
 class ChitaiGorodAPI:
     """API клиент для Читай-город с Allure отчетами"""
     
-    def __init__(self):
-        self.base_url = BASE_URL
-        self.timeout = API_TIMEOUT
+    def __init__(self, http2: bool = False, target=None, retries: int = 3, session=None):
+        self.target = target or DEFAULT_TARGET
+        self.base_url = self.target.base_url
+        self.timeout = self.target.timeout
+        self.http2 = http2
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8"
+            "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
+            # Запрашиваем все алгоритмы сжатия, которые умеет распаковывать выбранный транспорт
+            "Accept-Encoding": http2_accept_encoding() if http2 else requests_accept_encoding()
         }
+        # Объем передачи по запросам: байты по сети против распакованных
+        self.transfer_stats = TransferStats()
+        
+        # Политика повторов общая для обоих транспортов
+        retry_strategy = self.retry_policy(retries)
+        # Сессию, переданную извне (общую для нескольких клиентов), закрывает ее владелец
+        self._owns_session = session is None
+        
+        # Необязательный HTTP/2 транспорт (httpx) с мультиплексированием запросов
+        if http2:
+            self.session = session or Http2Session(retries=retry_strategy)
+            return
         
         # Создаем сессию с настройками редиректов
         self.session = requests.Session()
         
-        # Настраиваем политику повторных попыток
-        retry_strategy = Retry(
-            total=3,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"],
-            backoff_factor=1
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Адаптер считает байты тела ответа по сети до распаковки (для TransferStats)
+        adapter = TransferCountingAdapter(max_retries=retry_strategy)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
@@ -57,8 +91,38 @@ class ChitaiGorodAPI:
         import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
+    @staticmethod
+    def retry_policy(retries: int) -> Retry:
+        """Политика повторных попыток для requests и HTTP/2 транспорта"""
+        if retries:
+            return Retry(
+                total=retries,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "POST"],
+                backoff_factor=1
+            )
+        # Без повторов: бенчмарк и обход каталога получают статус и время первой попытки
+        return Retry(total=0, raise_on_status=False)
+    
+    @classmethod
+    def factory(cls, http2: bool = False, target=None, retries: int = 3, max_connections: int = 10):
+        """
+        Фабрика клиентов для многопоточных прогонов (бенчмарк поиска, обход каталога)
+        
+        requests.Session не рассчитана на общий доступ из потоков, поэтому без HTTP/2 каждый
+        поток получает свой клиент. С http2=True все клиенты используют одну потокобезопасную
+        Http2Session, и запросы потоков мультиплексируются в ее соединениях.
+        Фабрику нужно закрыть (close() или with), чтобы закрыть созданные клиенты и сессию.
+        """
+        return ClientFactory(cls, http2, target, retries, max_connections)
+    
+    def close(self):
+        """Закрыть сессию клиента, если она не общая"""
+        if self._owns_session:
+            self.session.close()
+    
     @allure.step("Выполнение HTTP запроса: {method} {endpoint}")
-    def _make_request(self, method: str, endpoint: str, params=None, allow_redirects=True, max_redirects=5):
+    def _make_request(self, method: str, endpoint: str, params=None, allow_redirects=True, max_redirects=5, stream=False):
         """Универсальный метод для выполнения HTTP запросов"""
         url = f"{self.base_url}{endpoint}"
         
@@ -76,7 +140,8 @@ class ChitaiGorodAPI:
                 headers=self.headers,
                 timeout=self.timeout,
                 verify=False,
-                allow_redirects=allow_redirects
+                allow_redirects=allow_redirects,
+                stream=stream
             )
             
             # Обрабатываем редиректы
@@ -88,11 +153,19 @@ class ChitaiGorodAPI:
                         break
                     
                     with allure.step(f"Редирект {redirect_count + 1} на: {redirect_url}"):
-                        response = self.session.get(redirect_url, verify=False, timeout=self.timeout)
+                        response.close()
+                        response = self.session.get(redirect_url, verify=False, timeout=self.timeout, stream=stream)
                         redirect_count += 1
             
             # Сохраняем информацию о ответе
-            response_info = f"Статус: {response.status_code}\nURL: {response.url}\nРазмер: {len(response.content)} байт"
+            # При потоковом чтении тело еще не загружено, размер неизвестен
+            if stream:
+                size_info = "потоковая передача"
+            else:
+                transfer = self.transfer_stats.record(response)
+                size_info = (f"{transfer.decoded_bytes} байт (по сети: {transfer.wire_bytes} байт, "
+                             f"{transfer.http_version}, Content-Encoding: {transfer.content_encoding})")
+            response_info = f"Статус: {response.status_code}\nURL: {response.url}\nРазмер: {size_info}"
             allure.attach(response_info, "Информация о ответе", allure.attachment_type.TEXT)
             
             return response
@@ -103,11 +176,36 @@ class ChitaiGorodAPI:
             # Возвращаем mock объект с корректными атрибутами
             return MockResponse(status_code=500, text=str(e), url=url)
     
-    @allure.step("Поиск продуктов по запросу: '{query}'")
-    def search_products(self, query: str):
+    @allure.step("Поиск продуктов по запросу: '{query}', страница {page}")
+    def search_products(self, query: str, page: int = 1):
         """Поиск продуктов по запросу"""
-        params = {"q": query, "page": "1"}
-        return self._make_request("GET", "/search", params, max_redirects=3)
+        params = {"q": query, "page": str(page)}
+        return self._make_request("GET", self.target.endpoint("search", "/search"), params, max_redirects=3)
+    
+    @allure.step("Получение товаров из результатов поиска: '{query}', страница {page}")
+    def get_search_product_records(self, query: str, page: int = 1):
+        """Получение типизированных записей о товарах из HTML результатов поиска"""
+        params = {"q": query, "page": str(page)}
+        response = self._make_request("GET", self.target.endpoint("search", "/search"), params,
+                                      max_redirects=3, stream=True)
+        return self._parse_product_records(response)
+    
+    @allure.step("Получение товаров каталога: {path}")
+    def get_catalog_product_records(self, path: str = "/catalog"):
+        """Получение типизированных записей о товарах из HTML страницы каталога"""
+        response = self._make_request("GET", path, max_redirects=3, stream=True)
+        return self._parse_product_records(response)
+    
+    def _parse_product_records(self, response):
+        """Разбор товаров из потокового ответа"""
+        if isinstance(response, MockResponse):
+            return []
+        with response:
+            if response.status_code != 200:
+                return []
+            products = list(parse_response(response))
+        allure.attach(f"Найдено товаров: {len(products)}", "Разбор товаров", allure.attachment_type.TEXT)
+        return products
     
     @allure.step("Получение списка категорий")
     def get_categories(self):
@@ -136,12 +234,53 @@ class ChitaiGorodAPI:
         return ""
 
 
+class ClientFactory:
+    """Фабрика клиентов ChitaiGorodAPI для многопоточных прогонов (см. ChitaiGorodAPI.factory)"""
+    
+    def __init__(self, client_class, http2=False, target=None, retries=3, max_connections=10):
+        self.client_class = client_class
+        self.http2 = http2
+        self.target = target
+        self.retries = retries
+        # Общая потокобезопасная HTTP/2 сессия для всех клиентов фабрики
+        self.session = (Http2Session(max_connections=max_connections, retries=client_class.retry_policy(retries))
+                        if http2 else None)
+        self._clients = []
+        self._lock = threading.Lock()
+    
+    def __call__(self):
+        client = self.client_class(http2=self.http2, target=self.target, retries=self.retries, session=self.session)
+        with self._lock:
+            self._clients.append(client)
+        return client
+    
+    def close(self):
+        """Закрыть все созданные клиенты и общую сессию"""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+        if self.session is not None:
+            self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+
+
 class TestChitaiGorodAPI:
     """Тесты API для Читай-город с Allure отчетами"""
     
-    def setup_method(self):
-        """Настройка перед каждым тестом"""
-        self.api = ChitaiGorodAPI()
+    @pytest.fixture(autouse=True)
+    def _select_target(self, env_target):
+        """Клиент API для окружения теста (pytest --targets production,staging), закрывается после теста"""
+        self.api = ChitaiGorodAPI(target=env_target)
+        allure.dynamic.parameter("Окружение", env_target.name)
+        allure.dynamic.tag(env_target.name)
+        yield
+        self.api.close()
     
     @allure.feature("Доступность API")
     @allure.story("Проверка доступности основного сайта")
@@ -316,10 +455,142 @@ class TestChitaiGorodAPI:
             allure.attach(metrics, "Метрики производительности", allure.attachment_type.TEXT)
         
         assert True, "Тест завершен (метрики производительности в отчете)"
+    
+    @allure.feature("Производительность")
+    @allure.story("Бенчмарк поиска по корпусу запросов")
+    @allure.severity(allure.severity_level.MINOR)
+    @allure.title("Бенчмарк задержек поиска")
+    def test_search_benchmark(self):
+        """Тест 7: Бенчмарк поиска по корпусу запросов"""
+        with allure.step(f"Прогон корпуса {SEARCH_CORPUS_PATH} ({SEARCH_BENCHMARK_PAGES} стр., "
+                         f"{SEARCH_BENCHMARK_CONCURRENCY} потоков)"):
+            output_path = SEARCH_BENCHMARK_OUTPUT.format(target=self.api.target.name)
+            with ChitaiGorodAPI.factory(BATCH_HTTP2, self.api.target, retries=0) as client_factory:
+                benchmark = SearchBenchmark(client_factory, concurrency=SEARCH_BENCHMARK_CONCURRENCY,
+                                            pages=SEARCH_BENCHMARK_PAGES)
+                report = benchmark.run(read_corpus(SEARCH_CORPUS_PATH), output_path)
+        
+        with allure.step("Анализ задержек поиска"):
+            allure.attach(report.format(), "Перцентили задержек по классам запросов", allure.attachment_type.TEXT)
+            allure.attach.file(output_path, name="Результаты запросов (JSONL)",
+                               attachment_type=allure.attachment_type.TEXT)
+            
+            if report.overall.error_rate < 0.05:
+                result_msg = f"✅ Доля ошибок: {report.overall.error_rate:.1%}"
+            else:
+                result_msg = f"⚠️ Высокая доля ошибок: {report.overall.error_rate:.1%}"
+            allure.attach(result_msg, "Результат бенчмарка", allure.attachment_type.TEXT)
+        
+        assert True, "Тест завершен (результаты бенчмарка в отчете)"
+    
+    @allure.feature("Каталог продуктов")
+    @allure.story("Проверка ссылок каталога")
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.title("Обход каталога и проверка ссылок")
+    def test_catalog_crawl(self):
+        """Тест 8: Обход каталога"""
+        with allure.step(f"Обход каталога (глубина {CRAWL_MAX_DEPTH}, не более {CRAWL_MAX_PAGES} категорий "
+                         f"и {CRAWL_MAX_PRODUCTS} товаров)"):
+            with ChitaiGorodAPI.factory(BATCH_HTTP2, self.api.target, retries=0) as client_factory:
+                crawler = CatalogCrawler(client_factory, concurrency=CRAWL_CONCURRENCY,
+                                         requests_per_second=CRAWL_REQUESTS_PER_SECOND,
+                                         max_depth=CRAWL_MAX_DEPTH, max_pages=CRAWL_MAX_PAGES,
+                                         max_products=CRAWL_MAX_PRODUCTS)
+                report = crawler.crawl()
+        
+        with allure.step("Анализ состояния ссылок"):
+            allure.attach(report.format(), "Отчет о ссылках каталога", allure.attachment_type.TEXT)
+            
+            if not report.broken:
+                result_msg = f"✅ Битых ссылок нет. Проверено страниц: {report.total}"
+            else:
+                result_msg = f"⚠️ Найдено битых ссылок: {len(report.broken)} из {report.total}"
+            allure.attach(result_msg, "Результат обхода", allure.attachment_type.TEXT)
+        
+        assert True, "Тест завершен (состояние ссылок в отчете)"
+    
+    @allure.feature("Функциональность поиска")
+    @allure.story("Разбор результатов поиска")
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.title("Проверка товаров в результатах поиска")
+    def test_search_product_records(self):
+        """Тест 9: Разбор результатов поиска"""
+        with allure.step(f"Получение товаров по запросу: '{TEST_SEARCH_QUERY}'"):
+            products = self.api.get_search_product_records(TEST_SEARCH_QUERY)
+        
+        with allure.step("Проверка соответствия запросу и цен"):
+            if products:
+                match_ratio = query_match_ratio(products, TEST_SEARCH_QUERY)
+                outliers = price_outliers(products)
+                available = sum(product.available for product in products)
+                
+                records = "\n".join(f"{product.title} | {product.author} | {product.price} | "
+                                     f"{'в наличии' if product.available else 'нет в наличии'} | {product.url}"
+                                     for product in products)
+                allure.attach(records, "Товары", allure.attachment_type.TEXT)
+                
+                result_msg = (f"Товаров: {len(products)}, в наличии: {available}\n"
+                              f"Соответствуют запросу: {match_ratio:.0%}\n"
+                              f"Подозрительных цен: {len(outliers)}")
+                allure.attach(result_msg, "Результат проверки товаров", allure.attachment_type.TEXT)
+            else:
+                allure.attach("⚠️ Товары в результатах поиска не найдены", "Результат проверки товаров",
+                              allure.attachment_type.TEXT)
+        
+        assert True, "Тест завершен (проверка товаров в отчете)"
+    
+    @allure.feature("Производительность")
+    @allure.story("Сжатие ответов и версия протокола")
+    @allure.severity(allure.severity_level.MINOR)
+    @allure.title("Проверка сжатия ответов и HTTP/2")
+    def test_transfer_compression(self):
+        """Тест 10: Сжатие ответов и объем передачи"""
+        transports = {"HTTP/1.1 (requests)": self.api}
+        if HTTP2_AVAILABLE:
+            transports["HTTP/2 (httpx)"] = ChitaiGorodAPI(http2=True, target=self.api.target)
+        else:
+            allure.attach('HTTP/2 транспорт недоступен: pip install "httpx[http2]" brotli zstandard',
+                          "Пропуск HTTP/2", allure.attachment_type.TEXT)
+        
+        try:
+            self._compare_transports(transports)
+        finally:
+            # self.api закрывается фикстурой _select_target, HTTP/2 клиент создан этим тестом
+            for api in transports.values():
+                if api is not self.api:
+                    api.close()
+        
+        assert True, "Тест завершен (метрики сжатия в отчете)"
+    
+    def _compare_transports(self, transports):
+        for transport_name, api in transports.items():
+            # Записи по каждому ответу нужны только этому тесту
+            api.transfer_stats = TransferStats(keep_records=True)
+            with allure.step(f"Запросы через {transport_name}"):
+                api.health_check()
+                api.search_products(TEST_SEARCH_QUERY)
+                allure.attach(f"Accept-Encoding: {api.headers['Accept-Encoding']}\n{api.transfer_stats.format()}",
+                              f"Объем передачи: {transport_name}", allure.attachment_type.TEXT)
+            
+            with allure.step(f"Анализ сжатия: {transport_name}"):
+                stats = api.transfer_stats
+                if stats.compressed_responses:
+                    result_msg = f"✅ Сжатых ответов: {stats.compressed_responses} из {stats.responses}"
+                else:
+                    result_msg = "⚠️ Сайт не вернул сжатых ответов"
+                allure.attach(result_msg, f"Результат: {transport_name}", allure.attachment_type.TEXT)
 
 
-def run_all_tests():
-    """Запуск всех тестов с генерацией Allure отчета"""
+def run_all_tests(profile_dir=None, target=None, results=None):
+    """Запуск всех тестов с генерацией Allure отчета
+    
+    Args:
+        profile_dir: Каталог для профилей памяти и CPU каждого теста (None - без профилирования)
+        target: Окружение для запуска (None - окружение по умолчанию)
+        results: Список, в который добавляются кортежи (тест, успех, длительность в секундах)
+    """
+    configure_profiling(profile_dir)
+    target = target or DEFAULT_TARGET
     
     # Создаем тестовый класс
     test_class = TestChitaiGorodAPI()
@@ -331,32 +602,51 @@ def run_all_tests():
         ("Информация о корзине", test_class.test_get_cart_info),
         ("Анализ главной страницы", test_class.test_analyze_main_page),
         ("Производительность API", test_class.test_api_performance),
+        ("Бенчмарк поиска", test_class.test_search_benchmark),
+        ("Обход каталога", test_class.test_catalog_crawl),
+        ("Разбор результатов поиска", test_class.test_search_product_records),
+        ("Сжатие ответов", test_class.test_transfer_compression),
     ]
     
     passed = 0
     failed = 0
     
-    print("🚀 Запуск тестов API Читай-город с Allure отчетами...")
+    print(f"🚀 Запуск тестов API Читай-город с Allure отчетами ({target.name}: {target.base_url})...")
     
     for test_name, test_func in tests:
         with allure.step(f"Выполнение теста: {test_name}"):
+            # Отсчет до try: длительность известна и при ошибке создания клиента
+            start_time = time.perf_counter()
+            test_class.api = None
             try:
-                # Переинициализируем API для каждого теста
-                test_class.setup_method()
+                # Свой клиент для каждого теста, как в фикстуре _select_target
+                test_class.api = ChitaiGorodAPI(target=target)
                 
-                print(f"🔹 Выполняется: {test_name}")
-                test_func()
-                print("✅ Завершено")
+                print(f"🔹 [{target.name}] Выполняется: {test_name}")
+                if profile_dir:
+                    with ResourceProfiler(f"{target.name}-{test_name}", profile_dir) as profiler:
+                        test_func()
+                    print(profiler.result.format())
+                    allure.attach(profiler.result.format(), "Профиль ресурсов теста", allure.attachment_type.TEXT)
+                else:
+                    test_func()
+                print(f"✅ [{target.name}] Завершено")
                 passed += 1
+                if results is not None:
+                    results.append((test_name, True, time.perf_counter() - start_time))
                 
                 allure.attach(f"Тест '{test_name}' завершен успешно", "Результат", allure.attachment_type.TEXT)
                 
             except Exception as e:
-                print(f"❌ Ошибка: {e}")
+                print(f"❌ [{target.name}] Ошибка: {e}")
                 failed += 1
+                if results is not None:
+                    results.append((test_name, False, time.perf_counter() - start_time))
                 allure.attach(f"Ошибка в тесте '{test_name}': {e}", "Ошибка", allure.attachment_type.TEXT)
             
             finally:
+                if test_class.api is not None:
+                    test_class.api.close()
                 time.sleep(1)  # Пауза между тестами
     
     # Финальный отчет
@@ -367,6 +657,7 @@ def run_all_tests():
         =============================
         ИТОГИ ТЕСТИРОВАНИЯ
         =============================
+        Окружение: {target.name} ({target.base_url})
         Всего тестов: {passed + failed}
         Успешно завершено: {passed}
         Ошибок выполнения: {failed}
@@ -378,9 +669,39 @@ def run_all_tests():
         allure.attach(summary, "Финальный отчет", allure.attachment_type.TEXT)
         print(summary)
     
+    configure_profiling(None)
     return passed, failed
 
 
+def run_matrix(target_names="all", profile_dir=None):
+    """Параллельный запуск всех тестов на нескольких окружениях со сводным отчетом
+    
+    Args:
+        target_names: Окружения через запятую или 'all'
+        profile_dir: Каталог для профилей памяти и CPU (None - без профилирования).
+            tracemalloc и семплирование общие для процесса, поэтому с профилированием
+            окружения запускаются последовательно
+    """
+    targets = select_targets(target_names)
+    results = {target.name: [] for target in targets}
+    
+    workers = 1 if profile_dir else len(targets)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            target.name: executor.submit(run_all_tests, profile_dir, target, results[target.name])
+            for target in targets
+        }
+        totals = {name: future.result() for name, future in futures.items()}
+    
+    # Сводная таблица: строки - тесты, столбцы - окружения, в ячейках длительность
+    with allure.step("Генерация сводного отчета по окружениям"):
+        report = format_matrix_report(results, totals)
+        allure.attach(report, "Сводный отчет по окружениям", allure.attachment_type.TEXT)
+        print(report)
+    
+    return totals
+
+
 if __name__ == "__main__":
     # Устанавливаем общие метаданные для отчета
     allure.dynamic.suite("API Тесты Читай-город")
@@ -390,4 +711,10 @@ if __name__ == "__main__":
     Включает проверки доступности, функциональности и производительности.
     """)
     
-    run_all_tests()
\ No newline at end of file
+    # API_TARGETS=production,staging или API_TARGETS=all - запуск на нескольких окружениях;
+    # STEP_TRACE=traces/api.json - временная шкала шагов и HTTP запросов прогона
+    with tracing_from_env():
+        if os.environ.get("API_TARGETS"):
+            run_matrix(os.environ["API_TARGETS"])
+        else:
+            run_all_tests()
\ No newline at end of file
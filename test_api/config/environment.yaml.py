@@ -1,7 +1,17 @@
-
-base_url: "https://www.chitai-gorod.ru"
+default: production
+api_timeout: 30
 api_endpoints:
   login: "/auth/login"
   book_catalog: "/catalog/books"
   user_info: "/user/profile"
   search: "/search"
+environments:
+  production:
+    base_url: "https://www.chitai-gorod.ru"
+  staging:
+    # Адрес стенда не хранится в репозитории: задается переменной API_TARGET_URL_STAGING
+    base_url: null
+  local:
+    # Локальная заглушка сайта
+    base_url: "http://127.0.0.1:8080"
+    api_timeout: 10
\ No newline at end of file
@@ -0,0 +1,96 @@
+import allure
+import pytest
+from product_parser import Product, parse_price, parse_products
+
+# Карточки в незакрытых <li>: каждая следующая <li> неявно закрывает предыдущую
+UNCLOSED_LIST_HTML = """
+<ul class="products">
+  <li class="product-card"><a href="/product/1"><p class="product-card__title">Мастер и Маргарита</a>
+    <p class="product-card__author">Михаил Булгаков
+    <div class="product-price">499 ₽</div>
+  <li class="product-card"><a href="/product/2"><p class="product-card__title">Белая гвардия</a>
+    <p class="product-card__author">Михаил Булгаков
+    <div class="product-price">Нет в наличии</div>
+</ul>
+<div class="product-card"><span class="product-card__title">После списка</span></div>
+"""
+
+# Старая и текущая цена: внешний product-price содержит вложенное значение product-price__value
+OLD_AND_CURRENT_PRICE_HTML = """
+<article class="product-card" data-chg-product-id="42">
+  <div class="product-card__title">Война и мир</div>
+  <div class="product-price">
+    <span class="product-price__old">2 000 ₽</span>
+    <span class="product-price__value">1&nbsp;500 ₽</span>
+    <span class="product-price__discount">-25%</span>
+  </div>
+  <button>Купить</button>
+</article>
+"""
+
+# Текст, разделенный <br> и соседними элементами
+SEPARATED_TEXT_HTML = """
+<div class="book-item">
+  <div class="book-item__title">Преступление<br>и наказание</div>
+  <div class="book-item__author"><span>Федор</span><span>Достоевский</span></div>
+  <div class="book-item__price">350 ₽</div>
+</div>
+"""
+
+
+def parse_chunks(html: str, chunk_size: int = 0):
+    chunks = [html[i:i + chunk_size] for i in range(0, len(html), chunk_size)] if chunk_size else [html]
+    return list(parse_products(chunks, "https://www.chitai-gorod.ru/search"))
+
+
+@allure.epic("Разбор карточек товаров")
+class TestProductParser:
+
+    @allure.story("Незакрытые элементы списка")
+    def test_unclosed_list_items_do_not_merge_cards(self):
+        products = parse_chunks(UNCLOSED_LIST_HTML)
+
+        assert products == [
+            Product("Мастер и Маргарита", "Михаил Булгаков", 499.0, True, "https://www.chitai-gorod.ru/product/1"),
+            Product("Белая гвардия", "Михаил Булгаков", None, False, "https://www.chitai-gorod.ru/product/2"),
+            Product("После списка", "", None, False, ""),
+        ]
+
+    @allure.story("Вложенные поля цены")
+    def test_innermost_price_replaces_outer_text(self):
+        products = parse_chunks(OLD_AND_CURRENT_PRICE_HTML)
+
+        assert len(products) == 1
+        assert products[0].title == "Война и мир"
+        assert products[0].price == 1500.0
+        assert products[0].available
+
+    @allure.story("Разделители текста")
+    def test_text_is_separated_by_elements(self):
+        products = parse_chunks(SEPARATED_TEXT_HTML)
+
+        assert [(product.title, product.author, product.price) for product in products] == [
+            ("Преступление и наказание", "Федор Достоевский", 350.0)]
+
+    @allure.story("Потоковый разбор")
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64])
+    def test_chunked_input_matches_whole_document(self, chunk_size):
+        html = UNCLOSED_LIST_HTML + OLD_AND_CURRENT_PRICE_HTML + SEPARATED_TEXT_HTML
+
+        assert parse_chunks(html, chunk_size) == parse_chunks(html)
+
+    @allure.story("Дедупликация записей")
+    def test_products_are_hashable(self):
+        products = parse_chunks(UNCLOSED_LIST_HTML) + parse_chunks(UNCLOSED_LIST_HTML)
+
+        assert len(set(products)) == 3
+        assert {product: product.title for product in products}[products[0]] == "Мастер и Маргарита"
+
+    @allure.story("Разбор цены")
+    @pytest.mark.parametrize("text, expected", [
+        ("1 299 ₽", 1299.0),
+        ("1 500,50 руб.", 1500.5),
+        ("Нет в наличии", None),
+    ])
+    def test_parse_price(self, text, expected):
+        assert parse_price(text) == expected
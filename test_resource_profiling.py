@@ -0,0 +1,52 @@
+import threading
+import time
+
+import allure
+from resource_profiling import ResourceProfiler, SamplingProfiler
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+@allure.epic("Профилирование ресурсов")
+class TestResourceProfiling:
+
+    @allure.story("Семплирование CPU")
+    def test_idle_threads_are_not_sampled(self):
+        sampler = SamplingProfiler(0.005)
+        sleeper = threading.Thread(target=time.sleep, args=(0.4,))
+        worker = threading.Thread(target=busy, args=(0.4,))
+        sampler.start()
+        sleeper.start()
+        worker.start()
+        sleeper.join()
+        worker.join()
+        sampler.stop()
+
+        hot = [label for label, _, _ in sampler.hot_functions(10)]
+        assert hot and hot[0].startswith("busy ")
+        assert not any(label.startswith(("run (threading.py", "wait (threading.py")) for label in hot)
+
+    @allure.story("Замеры из разных потоков")
+    def test_concurrent_profilers_in_other_threads_are_rejected(self, tmp_path):
+        errors = []
+
+        def profile_in_thread():
+            try:
+                with ResourceProfiler("other", str(tmp_path)):
+                    pass
+            except RuntimeError as e:
+                errors.append(e)
+
+        with ResourceProfiler("outer", str(tmp_path)):
+            thread = threading.Thread(target=profile_in_thread)
+            thread.start()
+            thread.join()
+
+        assert len(errors) == 1 and "other" in str(errors[0])
+        with ResourceProfiler("after", str(tmp_path)) as profiler:
+            pass
+        assert profiler.result.files
@@ -0,0 +1,32 @@
+import allure
+import pytest
+from search_benchmark import BenchmarkReport, classify_query
+
+
+@allure.epic("Бенчмарк поиска")
+class TestSearchBenchmark:
+
+    @allure.story("Классы запросов")
+    @pytest.mark.parametrize("query, expected", [
+        ("978-5-17-118366-5", "isbn"),
+        ("9785171183665", "isbn"),
+        ("5-17-118366-X", "isbn"),
+        ("12345", "numeric"),
+        ("100 500", "numeric"),
+        ("1984", "numeric"),
+        ("Мастер и Маргарита", "long"),
+        ("Dune", "latin"),
+        ("Пушкин", "cyrillic"),
+    ])
+    def test_classify_query(self, query, expected):
+        assert classify_query(query) == expected
+
+    @allure.story("Доля ошибок")
+    def test_error_rate_uses_query_weights(self):
+        report = BenchmarkReport()
+        report.add("частый", 1, "cyrillic", 3.0, 100.0, 200)
+        report.add("редкий", 1, "cyrillic", 1.0, 100.0, 503)
+
+        # Ошибка редкого запроса весит столько же, сколько в перцентилях: 1 из 4
+        assert report.overall.error_rate == pytest.approx(0.25)
+        assert report.overall.errors == 1 and report.overall.requests == 2
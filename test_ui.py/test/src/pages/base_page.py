@@ -1,16 +1,25 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Sequence, Tuple, TYPE_CHECKING
+from urllib.parse import urlsplit
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import allure
+import os
 import time
 
+if TYPE_CHECKING:
+    # numpy и Pillow нужны только визуальному сравнению и импортируются в compare_screenshot
+    from src.utils.visual_diff import Region, VisualComparator, VisualDiffResult
+
 
 class BasePage:
     """Базовый класс для всех Page Object"""
     
+    # Адрес страницы окружения; задается наследниками, хост добавляется к именам эталонов
+    base_url: str = ""
+    
     def __init__(self, driver: WebDriver, timeout: int = 10):
         self.driver: WebDriver = driver
         self.wait: WebDriverWait = WebDriverWait(driver, timeout)
@@ -52,6 +61,34 @@ class BasePage:
     def take_screenshot(self, name: str) -> str:
         """Сделать скриншот и прикрепить к Allure"""
         screenshot_path = f"screenshots/{name}.png"
+        os.makedirs("screenshots", exist_ok=True)
         self.driver.save_screenshot(screenshot_path)
         allure.attach.file(screenshot_path, name=name, attachment_type=allure.attachment_type.PNG)
-        return screenshot_path
\ No newline at end of file
+        return screenshot_path
+    
+    @allure.step("Получить область элемента: {by}={locator}")
+    def get_element_region(self, by: str, locator: str) -> 'Region':
+        """Получить координаты и размер элемента для маскирования на скриншоте"""
+        rect = self.find_element(by, locator).rect
+        return int(rect["x"]), int(rect["y"]), int(rect["width"]), int(rect["height"])
+    
+    @allure.step("Сравнить скриншот с эталоном: {name}")
+    def compare_screenshot(self, name: str, masked_regions: Optional[Sequence['Region']] = None,
+                           masked_locators: Optional[Sequence[Tuple[str, str]]] = None,
+                           comparator: Optional['VisualComparator'] = None) -> 'VisualDiffResult':
+        """Сделать скриншот и сравнить с эталоном, скрыв динамические области (баннеры и т.п.)
+        
+        Скрываются все элементы, найденные по masked_locators (без ожидания появления).
+        Имя эталона дополняется хостом base_url, чтобы эталоны окружений не смешивались.
+        """
+        from src.utils.visual_diff import VisualComparator
+        
+        regions = list(masked_regions or [])
+        for by, locator in masked_locators or []:
+            for element in self.driver.find_elements(by, locator):
+                rect = element.rect
+                regions.append((int(rect["x"]), int(rect["y"]), int(rect["width"]), int(rect["height"])))
+        if self.base_url:
+            name = f"{urlsplit(self.base_url).netloc}_{name}"
+        screenshot_path = self.take_screenshot(name)
+        return (comparator or VisualComparator()).compare(name, screenshot_path, regions)
\ No newline at end of file
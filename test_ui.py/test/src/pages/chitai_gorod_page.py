@@ -9,9 +9,9 @@ from src.pages.base_page import BasePage
 class ChitaiGorodPage(BasePage):
     """Page Object для сайта Читай-город"""
     
-    def __init__(self, driver: WebDriver):
+    def __init__(self, driver: WebDriver, base_url: str = "https://www.chitai-gorod.ru/"):
         super().__init__(driver)
-        self.base_url: str = "https://www.chitai-gorod.ru/"
+        self.base_url: str = base_url
     
     # Локаторы
     COOKIE_ACCEPT_BUTTON: str = "//button[contains(text(), 'Принять') or contains(text(), 'Согласен')]"
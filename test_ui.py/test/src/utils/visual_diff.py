@@ -0,0 +1,246 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+import numpy as np
+from PIL import Image
+import allure
+
+
+# Область скриншота: x, y, ширина, высота
+Region = Tuple[int, int, int, int]
+
+# Число потоков пакетного сравнения по умолчанию: каждый поток держит в памяти около пяти
+# полноразмерных массивов (два скриншота, промежуточные max/min и разница)
+DEFAULT_WORKERS = 4
+
+# Размер изображения для перцептивного хеша и размер блока низких частот
+_HASH_IMAGE_SIZE = 32
+_HASH_SIZE = 8
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Матрица DCT-II для векторизованного двумерного преобразования"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0, :] = np.sqrt(1.0 / size)
+    return matrix
+
+
+_DCT = _dct_matrix(_HASH_IMAGE_SIZE)
+
+
+def _load_rgb(path: str) -> np.ndarray:
+    """Загрузить изображение как массив HxWx3 uint8"""
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def _visible_mask(height: int, width: int, masked_regions: Sequence[Region]) -> Optional[np.ndarray]:
+    """Булева маска пикселей, участвующих в сравнении (None - сравниваются все)"""
+    if not masked_regions:
+        return None
+    mask = np.ones((height, width), dtype=bool)
+    for x, y, w, h in masked_regions:
+        mask[max(y, 0):max(y + h, 0), max(x, 0):max(x + w, 0)] = False
+    return mask
+
+
+def perceptual_hash(pixels: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Перцептивный хеш (pHash) изображения в виде 64 булевых значений"""
+    gray = Image.fromarray(pixels).convert("L")
+    if mask is not None:
+        # Скрытые области заливаются нейтральным серым, чтобы не влиять на хеш
+        gray = Image.fromarray(np.where(mask, np.asarray(gray), np.uint8(128)))
+    small = gray.resize((_HASH_IMAGE_SIZE, _HASH_IMAGE_SIZE), Image.BILINEAR)
+    coefficients = _DCT @ np.asarray(small, dtype=np.float64) @ _DCT.T
+    low = coefficients[:_HASH_SIZE, :_HASH_SIZE].ravel()
+    # Постоянная составляющая не учитывается при вычислении медианы
+    return low > np.median(low[1:])
+
+
+class VisualDiffResult:
+    """Результат сравнения скриншота с эталоном"""
+
+    def __init__(self, name: str, mismatch_ratio: float = 0.0, hash_distance: int = 0,
+                 passed: bool = True, diff_path: Optional[str] = None, baseline_created: bool = False):
+        self.name = name
+        self.mismatch_ratio = mismatch_ratio
+        self.hash_distance = hash_distance
+        self.passed = passed
+        self.diff_path = diff_path
+        self.baseline_created = baseline_created
+
+    def __repr__(self) -> str:
+        return (f"VisualDiffResult(name={self.name!r}, passed={self.passed}, "
+                f"mismatch_ratio={self.mismatch_ratio:.5f}, hash_distance={self.hash_distance})")
+
+
+class VisualComparator:
+    """Сравнение скриншотов с эталонными изображениями"""
+
+    def __init__(self, baseline_dir: str = "screenshots/baseline", diff_dir: str = "screenshots/diff",
+                 pixel_tolerance: int = 16, max_mismatch_ratio: float = 0.001,
+                 max_hash_distance: int = 6, workers: Optional[int] = None):
+        """
+        Args:
+            baseline_dir: Каталог с эталонными скриншотами
+            diff_dir: Каталог для тепловых карт различий
+            pixel_tolerance: Допустимое отклонение канала пикселя (0-255)
+            max_mismatch_ratio: Допустимая доля отличающихся пикселей
+            max_hash_distance: Допустимое расстояние Хэмминга между pHash (из 64 бит)
+            workers: Число потоков для пакетного сравнения (ограничивает пиковую память)
+        """
+        self.baseline_dir = baseline_dir
+        self.diff_dir = diff_dir
+        self.pixel_tolerance = pixel_tolerance
+        self.max_mismatch_ratio = max_mismatch_ratio
+        self.max_hash_distance = max_hash_distance
+        self.workers = workers or min(DEFAULT_WORKERS, os.cpu_count() or 1)
+
+    def baseline_path(self, name: str) -> str:
+        """Путь к эталонному скриншоту"""
+        return os.path.join(self.baseline_dir, f"{name}.png")
+
+    @allure.step("Обновить эталонный скриншот: {name}")
+    def update_baseline(self, name: str, screenshot_path: str) -> str:
+        """Сохранить скриншот как новый эталон"""
+        return self._store_baseline(name, screenshot_path)
+
+    @allure.step("Сравнить скриншот '{name}' с эталоном")
+    def compare(self, name: str, screenshot_path: str,
+                masked_regions: Optional[Sequence[Region]] = None) -> VisualDiffResult:
+        """Сравнить скриншот с эталоном и приложить результат к Allure"""
+        result = self._compare(name, screenshot_path, masked_regions or ())
+        self._attach_result(result)
+        return result
+
+    @allure.step("Пакетное сравнение скриншотов с эталонами")
+    def compare_many(self, screenshots: Iterable[Tuple[str, str, Optional[Sequence[Region]]]]) -> List[VisualDiffResult]:
+        """
+        Сравнить набор скриншотов параллельно
+
+        Скриншоты с одинаковым именем сравниваются последовательно в одном потоке,
+        чтобы первый из них создал отсутствующий эталон, а остальные сравнивались с ним.
+
+        Args:
+            screenshots: Кортежи (имя, путь к скриншоту, скрытые области)
+        """
+        groups: Dict[str, List[Tuple[int, str, Optional[Sequence[Region]]]]] = {}
+        count = 0
+        for index, (name, screenshot_path, masked_regions) in enumerate(screenshots):
+            groups.setdefault(name, []).append((index, screenshot_path, masked_regions))
+            count = index + 1
+
+        results: List[Optional[VisualDiffResult]] = [None] * count
+
+        def compare_group(name: str, items) -> None:
+            for index, screenshot_path, masked_regions in items:
+                results[index] = self._compare(name, screenshot_path, masked_regions or ())
+
+        # Декодирование PNG и операции NumPy освобождают GIL, поэтому потоки дают выигрыш
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(compare_group, name, items) for name, items in groups.items()]:
+                future.result()
+
+        # Вложения Allure добавляются из основного потока
+        for result in results:
+            if not result.passed:
+                self._attach_result(result)
+
+        failed = [result for result in results if not result.passed]
+        created = sum(result.baseline_created for result in results)
+        summary = (f"Всего скриншотов: {len(results)}\n"
+                   f"Совпадают с эталоном: {len(results) - len(failed) - created}\n"
+                   f"Новых эталонов: {created}\n"
+                   f"Отличаются: {len(failed)}")
+        if failed:
+            summary += "\n" + "\n".join(f"  {result.name}: {result.mismatch_ratio:.3%}, "
+                                        f"pHash {result.hash_distance}" for result in failed)
+        allure.attach(summary, "Итог визуального сравнения", allure.attachment_type.TEXT)
+        return results
+
+    def _store_baseline(self, name: str, screenshot_path: str) -> str:
+        path = self.baseline_path(name)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(screenshot_path, "rb") as source, open(path, "wb") as target:
+            target.write(source.read())
+        return path
+
+    def _compare(self, name: str, screenshot_path: str, masked_regions: Sequence[Region]) -> VisualDiffResult:
+        baseline_path = self.baseline_path(name)
+        if not os.path.exists(baseline_path):
+            self._store_baseline(name, screenshot_path)
+            return VisualDiffResult(name, baseline_created=True)
+
+        # Быстрый путь: побайтно одинаковые файлы не нужно декодировать
+        if not masked_regions and os.path.getsize(baseline_path) == os.path.getsize(screenshot_path):
+            with open(baseline_path, "rb") as baseline_file, open(screenshot_path, "rb") as actual_file:
+                if baseline_file.read() == actual_file.read():
+                    return VisualDiffResult(name)
+
+        baseline = _load_rgb(baseline_path)
+        actual = _load_rgb(screenshot_path)
+
+        # Полностраничные скриншоты могут отличаться по высоте: сравнивается общая часть,
+        # а выступающая часть считается отличием
+        height = min(baseline.shape[0], actual.shape[0])
+        width = min(baseline.shape[1], actual.shape[1])
+        full_area = max(baseline.shape[0] * baseline.shape[1], actual.shape[0] * actual.shape[1])
+        baseline_common = baseline[:height, :width]
+        actual_common = actual[:height, :width]
+        mask = _visible_mask(height, width, masked_regions)
+
+        # Разница без перехода к знаковому типу: max - min в uint8
+        channel_diff = np.maximum(baseline_common, actual_common) - np.minimum(baseline_common, actual_common)
+        # Поканальный максимум быстрее, чем редукция max(axis=2) по короткой оси
+        pixel_diff = np.maximum(np.maximum(channel_diff[..., 0], channel_diff[..., 1]), channel_diff[..., 2])
+        changed = pixel_diff > self.pixel_tolerance
+        if mask is not None:
+            changed &= mask
+            compared_area = int(np.count_nonzero(mask)) + (full_area - height * width)
+        else:
+            compared_area = full_area
+        mismatched = int(np.count_nonzero(changed)) + (full_area - height * width)
+        mismatch_ratio = mismatched / compared_area if compared_area else 0.0
+
+        hash_distance = int(np.count_nonzero(
+            perceptual_hash(baseline_common, mask) != perceptual_hash(actual_common, mask)))
+
+        passed = mismatch_ratio <= self.max_mismatch_ratio and hash_distance <= self.max_hash_distance
+        result = VisualDiffResult(name, mismatch_ratio, hash_distance, passed)
+        if not passed:
+            # Тепловая карта строится только при превышении порога
+            result.diff_path = self._save_heatmap(name, actual_common, pixel_diff, mask)
+        return result
+
+    def _save_heatmap(self, name: str, actual: np.ndarray, pixel_diff: np.ndarray,
+                      mask: Optional[np.ndarray]) -> str:
+        """Наложить тепловую карту различий на приглушенный актуальный скриншот"""
+        intensity = pixel_diff.astype(np.float32) / 255.0
+        if mask is not None:
+            intensity[~mask] = 0.0
+        background = np.asarray(Image.fromarray(actual).convert("L"), dtype=np.float32) * 0.3
+        heatmap = np.empty(actual.shape, dtype=np.uint8)
+        heatmap[..., 0] = np.clip(background + intensity * 255.0 * 4.0, 0, 255)
+        heatmap[..., 1] = background
+        heatmap[..., 2] = np.where(mask, background, 255.0) if mask is not None else background
+
+        path = os.path.join(self.diff_dir, f"{name}_diff.png")
+        os.makedirs(self.diff_dir, exist_ok=True)
+        # Минимальное сжатие: тепловая карта нужна для отчета, а не для хранения
+        Image.fromarray(heatmap).save(path, compress_level=1)
+        return path
+
+    def _attach_result(self, result: VisualDiffResult) -> None:
+        if result.baseline_created:
+            allure.attach(f"Эталон для '{result.name}' отсутствовал и был создан",
+                          "Визуальное сравнение", allure.attachment_type.TEXT)
+            return
+        details = (f"Доля отличающихся пикселей: {result.mismatch_ratio:.3%}\n"
+                   f"Расстояние pHash: {result.hash_distance}\n"
+                   f"Результат: {'✅ совпадает' if result.passed else '❌ отличается'}")
+        allure.attach(details, f"Визуальное сравнение: {result.name}", allure.attachment_type.TEXT)
+        if result.diff_path:
+            allure.attach.file(result.diff_path, name=f"Различия: {result.name}",
+                               attachment_type=allure.attachment_type.PNG)
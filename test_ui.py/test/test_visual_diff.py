@@ -0,0 +1,119 @@
+import os
+import numpy as np
+import pytest
+import allure
+from PIL import Image
+from src.utils.visual_diff import VisualComparator
+
+
+def save_image(path, pixels: np.ndarray) -> str:
+    Image.fromarray(pixels).save(path)
+    return str(path)
+
+
+@pytest.fixture
+def page_image():
+    """Синтетическая «страница»: полосы текста на белом фоне"""
+    pixels = np.full((400, 300, 3), 255, dtype=np.uint8)
+    for top in range(10, 400, 40):
+        pixels[top:top + 12, 20:260] = (30, 30, 30)
+        pixels[top:top + 20, 270:290] = (top % 255, 120, 60)
+    return pixels
+
+
+@pytest.fixture
+def comparator(tmp_path):
+    return VisualComparator(str(tmp_path / "baseline"), str(tmp_path / "diff"))
+
+
+@allure.epic("Визуальная регрессия")
+class TestVisualComparator:
+
+    @allure.story("Создание эталона")
+    def test_creates_missing_baseline(self, tmp_path, comparator, page_image):
+        screenshot = save_image(tmp_path / "page.png", page_image)
+
+        result = comparator.compare("page", screenshot)
+
+        assert result.passed and result.baseline_created
+        assert os.path.exists(comparator.baseline_path("page"))
+
+    @allure.story("Побайтно одинаковые скриншоты")
+    def test_identical_file_skips_decoding(self, tmp_path, comparator, page_image, monkeypatch):
+        screenshot = save_image(tmp_path / "page.png", page_image)
+        comparator.update_baseline("page", screenshot)
+
+        def fail_decode(path):
+            raise AssertionError("одинаковые файлы не должны декодироваться")
+        monkeypatch.setattr("src.utils.visual_diff._load_rgb", fail_decode)
+
+        result = comparator.compare("page", screenshot)
+
+        assert result.passed and not result.baseline_created
+        assert result.mismatch_ratio == 0.0 and result.diff_path is None
+
+    @allure.story("Скрытые области")
+    def test_masked_region_cancels_difference(self, tmp_path, comparator, page_image):
+        comparator.update_baseline("page", save_image(tmp_path / "baseline.png", page_image))
+        changed = page_image.copy()
+        changed[100:160, 50:250] = (200, 0, 0)  # «баннер» с новым содержимым
+        screenshot = save_image(tmp_path / "changed.png", changed)
+
+        unmasked = comparator.compare("page", screenshot)
+        masked = comparator.compare("page", screenshot, [(50, 100, 200, 60)])
+
+        assert not unmasked.passed
+        assert masked.passed and masked.mismatch_ratio == 0.0
+
+    @allure.story("Разная высота скриншотов")
+    def test_height_mismatch_counts_extra_area(self, tmp_path, comparator, page_image):
+        comparator.update_baseline("page", save_image(tmp_path / "baseline.png", page_image))
+        taller = np.vstack([page_image, np.full((100, 300, 3), 255, dtype=np.uint8)])
+
+        result = comparator.compare("page", save_image(tmp_path / "taller.png", taller))
+
+        # Выступающие 100 строк из 500 считаются отличием
+        assert result.mismatch_ratio == pytest.approx(100 / 500)
+        assert not result.passed
+
+    @allure.story("Тепловая карта различий")
+    def test_heatmap_written_only_above_threshold(self, tmp_path, page_image):
+        comparator = VisualComparator(str(tmp_path / "baseline"), str(tmp_path / "diff"),
+                                      max_mismatch_ratio=0.01)
+        comparator.update_baseline("page", save_image(tmp_path / "baseline.png", page_image))
+
+        small = page_image.copy()
+        small[0:5, 0:5] = 0  # 25 пикселей из 120000 - ниже порога
+        below = comparator.compare("page", save_image(tmp_path / "small.png", small))
+        assert below.passed and below.diff_path is None
+        assert not os.path.exists(tmp_path / "diff")
+
+        large = page_image.copy()
+        large[200:300, :] = 0
+        above = comparator.compare("page", save_image(tmp_path / "large.png", large))
+        assert not above.passed
+        assert above.diff_path and os.path.exists(above.diff_path)
+
+    @allure.story("Пакетное сравнение")
+    def test_compare_many(self, tmp_path, comparator, page_image):
+        screenshot = save_image(tmp_path / "page.png", page_image)
+        comparator.update_baseline("page", screenshot)
+
+        results = comparator.compare_many([("page", screenshot, None)] * 5 + [("new", screenshot, None)])
+
+        assert all(result.passed for result in results)
+        assert [result.baseline_created for result in results] == [False] * 5 + [True]
+
+
+    @allure.story("Пакетное сравнение")
+    def test_compare_many_same_name_uses_first_as_baseline(self, tmp_path, comparator, page_image):
+        first = save_image(tmp_path / "first.png", page_image)
+        changed = page_image.copy()
+        changed[100:200, :] = 0
+        second = save_image(tmp_path / "second.png", changed)
+
+        results = comparator.compare_many([("new", first, None), ("new", second, None)])
+
+        # Первый скриншот создает эталон, второй сравнивается с ним, а не перезаписывает его
+        assert results[0].baseline_created and results[0].passed
+        assert not results[1].baseline_created and not results[1].passed
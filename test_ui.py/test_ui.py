@@ -6,15 +6,28 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 import time
+import os
+import sys
 
+# Вспомогательные модули Page Object (src/) лежат в соседней папке test,
+# общие плагины (трассировка, окружения) - в корне репозитория
+_UI_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_UI_DIR, "test"))
+sys.path.insert(0, os.path.dirname(_UI_DIR))
+from src.pages.base_page import BasePage
+from environments import format_matrix_report, get_target, select_targets
+from step_tracing import tracing_from_env
 
-class ChitaiGorodPage:
+# Динамические области главной страницы, скрываемые при визуальном сравнении
+DYNAMIC_REGIONS = [".banner", ".slider", ".swiper", "[class*='carousel']", "[class*='promo']"]
+
+
+class ChitaiGorodPage(BasePage):
     """Page Object для сайта Читай-город"""
     
-    def __init__(self, driver):
-        self.driver = driver
-        self.wait = WebDriverWait(driver, 15)
-        self.base_url = "https://www.chitai-gorod.ru/"
+    def __init__(self, driver, base_url="https://www.chitai-gorod.ru/"):
+        super().__init__(driver, timeout=15)
+        self.base_url = base_url
     
     @allure.step("Открыть главную страницу")
     def open_main_page(self):
@@ -150,8 +163,10 @@ def driver():
 
 
 @pytest.fixture
-def page(driver):
-    return ChitaiGorodPage(driver)
+def page(driver, env_target):
+    # Окружение задается опцией pytest --targets (плагин environments)
+    allure.dynamic.parameter("Окружение", env_target.name)
+    return ChitaiGorodPage(driver, env_target.ui_base_url)
 
 
 @allure.epic("UI Тесты для Читай-город")
@@ -222,16 +237,34 @@ class TestAdditionalFeatures:
         page.open_main_page().accept_cookies()
         
         current_url = page.get_current_url()
-        assert current_url.startswith("https://www.chitai-gorod.ru/"), f"Некорректный URL: {current_url}"
+        assert current_url.startswith(page.base_url), f"Некорректный URL: {current_url}"
         
         print(f"✅ Тест 7 пройден: URL корректен - {current_url}")
+    
+    @allure.story("Тест 8: Визуальная регрессия главной страницы")
+    def test_main_page_visual(self, page):
+        """Тест сравнения главной страницы с эталонным скриншотом"""
+        page.open_main_page().accept_cookies()
+        
+        result = page.compare_screenshot(
+            "main_page", masked_locators=[(By.CSS_SELECTOR, selector) for selector in DYNAMIC_REGIONS])
+        assert result.passed, (f"Главная страница отличается от эталона: {result.mismatch_ratio:.3%} пикселей, "
+                               f"pHash {result.hash_distance}, различия: {result.diff_path}")
+        
+        print(f"✅ Тест 8 пройден: {result}")
 
 
-def run_all_tests():
-    """Запуск всех тестов без pytest"""
+def run_all_tests(target=None, results=None):
+    """Запуск всех тестов без pytest
+    
+    Args:
+        target: Окружение (TargetEnvironment), по умолчанию - указанное в default конфигурации
+        results: Список, в который добавляются кортежи (тест, успех, длительность в секундах)
+    """
+    target = target or get_target()
     driver = webdriver.Chrome()
     driver.maximize_window()
-    page = ChitaiGorodPage(driver)
+    page = ChitaiGorodPage(driver, target.ui_base_url)
     
     tests = [
         ("Тест 1: Открытие главной страницы", TestChitaiGorodUI().test_open_main_page),
@@ -240,20 +273,28 @@ def run_all_tests():
         ("Тест 4: Карточки товаров", TestChitaiGorodUI().test_product_cards),
         ("Тест 6: Заголовок", TestAdditionalFeatures().test_page_title_length),
         ("Тест 7: URL", TestAdditionalFeatures().test_page_url),
+        ("Тест 8: Визуальная регрессия", TestAdditionalFeatures().test_main_page_visual),
     ]
     
     passed = 0
     failed = 0
     
+    print(f"🚀 Запуск UI тестов ({target.name}: {target.ui_base_url})")
+    
     for test_name, test_func in tests:
+        start_time = time.perf_counter()
         try:
-            print(f"\n🔹 {test_name}")
+            print(f"\n🔹 [{target.name}] {test_name}")
             test_func(page)
             print("✅ Успешно")
             passed += 1
+            if results is not None:
+                results.append((test_name, True, time.perf_counter() - start_time))
         except Exception as e:
             print(f"❌ Ошибка: {e}")
             failed += 1
+            if results is not None:
+                results.append((test_name, False, time.perf_counter() - start_time))
         finally:
             # Небольшая пауза между тестами
             time.sleep(2)
@@ -264,5 +305,29 @@ def run_all_tests():
     return passed, failed
 
 
+def run_matrix(target_names="all"):
+    """Запуск всех тестов на нескольких окружениях со сводным отчетом
+    
+    Окружения проходятся последовательно: каждому нужен свой браузер,
+    а снимки для визуального сравнения пишутся в общий каталог screenshots
+    """
+    results = {}
+    totals = {}
+    for target in select_targets(target_names):
+        results[target.name] = []
+        totals[target.name] = run_all_tests(target, results[target.name])
+    
+    report = format_matrix_report(results, totals)
+    allure.attach(report, "Сводный отчет по окружениям", allure.attachment_type.TEXT)
+    print(report)
+    return totals
+
+
 if __name__ == "__main__":
-    run_all_tests()
\ No newline at end of file
+    # UI_TARGETS=production,staging или UI_TARGETS=all - запуск на нескольких окружениях;
+    # STEP_TRACE=traces/ui.json - временная шкала шагов и команд WebDriver прогона
+    with tracing_from_env():
+        if os.environ.get("UI_TARGETS"):
+            run_matrix(os.environ["UI_TARGETS"])
+        else:
+            run_all_tests()
\ No newline at end of file